@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from statistics import mean, median
+from time import perf_counter
+
+
+# ******************************************************************************************************************** #
+# *** LOAD BENCHMARK
+# ******************************************************************************************************************** #
+# runs the bots in tests.py for <num_participants> participants via "otree test" and summarizes the latencies (and
+# database queries) recorded by cem/benchmark.py into a JSON report, e.g.
+#   python benchmark_bots.py cem 2000 --label v1.2 --output benchmark_cem.json
+# ******************************************************************************************************************** #
+
+
+# percentile of a sorted list of values
+# --------------------------------------------------------------------------------------------------------------------
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+# summarize records by name
+# --------------------------------------------------------------------------------------------------------------------
+def summarize(records):
+
+    by_name = defaultdict(list)
+    for r in records:
+        by_name[r['name']].append(r)
+
+    summary = {}
+    for name, rs in sorted(by_name.items()):
+        seconds = sorted(r['seconds'] for r in rs)
+        queries = [r['queries'] for r in rs if r['queries'] is not None]
+        summary[name] = {
+            'count':        len(seconds),
+            'mean_ms':      mean(seconds) * 1000,
+            'median_ms':    median(seconds) * 1000,
+            'p95_ms':       percentile(seconds, 95) * 1000,
+            'max_ms':       seconds[-1] * 1000,
+            'total_ms':     sum(seconds) * 1000,
+            'mean_queries': mean(queries) if queries else None
+        }
+
+    return summary
+
+
+# run bots for a session config and return summary
+# --------------------------------------------------------------------------------------------------------------------
+def run(session_config, num_participants):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'records.jsonl')
+        env = dict(os.environ, OTREE_BENCHMARK=path)
+
+        start = perf_counter()
+        subprocess.run(['otree', 'test', session_config, str(num_participants)], env=env, check=True)
+        wall = perf_counter() - start
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+
+    return {
+        'session_config':   session_config,
+        'num_participants': num_participants,
+        'mode':             records[0]['mode'] if records else None,
+        'wall_seconds':     wall,
+        'timings':          summarize(records)
+    }
+
+
+# ******************************************************************************************************************** #
+# *** MAIN
+# ******************************************************************************************************************** #
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Bot-driven load benchmark with per-page latency report.')
+    parser.add_argument('session_configs', nargs='+', help='names of session configs in settings.py')
+    parser.add_argument('num_participants', type=int, help='number of simulated participants per session')
+    parser.add_argument('--label', default='', help='label of the version benchmarked, e.g. a git revision')
+    parser.add_argument('--output', help='path of the JSON report (default: stdout)')
+    args = parser.parse_args()
+
+    report = {
+        'label':    args.label,
+        'python':   sys.version.split()[0],
+        'sessions': [run(name, args.num_participants) for name in args.session_configs]
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
@@ -0,0 +1,132 @@
+import atexit
+import json
+from contextlib import contextmanager
+from functools import wraps
+from os import environ
+from time import perf_counter
+from cem.config import Constants
+
+try:
+    from sqlalchemy import event
+    from otree.database import engine
+except ImportError:
+    engine = None
+
+
+# ******************************************************************************************************************** #
+# *** BENCHMARK RECORDER
+# ******************************************************************************************************************** #
+
+# path of the file records are written to (JSON lines); if <OTREE_BENCHMARK> is not set, nothing is recorded
+# --------------------------------------------------------------------------------------------------------------------
+REPORT = environ.get('OTREE_BENCHMARK')
+
+records = []
+
+
+# display mode of the task in the session of <obj> (a page, player, or subsession), i.e. <one_choice_per_page> and
+# <bisection> set in config.py and <paginated> of the session's task specification (which may be set per session);
+# if the session is not known (yet), <paginated> is taken from config.py
+# --------------------------------------------------------------------------------------------------------------------
+def display_mode(obj=None):
+    if Constants.one_choice_per_page:
+        return 'one_choice_per_page'
+    if Constants.bisection:
+        return 'bisection'
+    session = getattr(obj, 'session', None)
+    if session is not None:
+        from cem import models
+        paginated = models.task_spec(models.spec_key(session.config)).paginated
+    else:
+        paginated = Constants.paginated
+    return 'paginated' if paginated else 'table'
+
+
+# count database queries executed within a block, i.e. the statements executed by oTree's SQLAlchemy engine while
+# the counter is active (blocks may be nested, e.g. <Decision.before_next_page> within <Decision.post>); changes that
+# oTree only flushes when committing at the end of a request are not included
+# --------------------------------------------------------------------------------------------------------------------
+class QueryCounter:
+
+    active = []
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        QueryCounter.active.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        QueryCounter.active.remove(self)
+
+    @staticmethod
+    def before_cursor_execute(*args):
+        for counter in QueryCounter.active:
+            counter.count += 1
+
+
+# listen to the statements of oTree's engine only if records are written
+# --------------------------------------------------------------------------------------------------------------------
+if REPORT and engine is not None:
+    event.listen(engine, 'before_cursor_execute', QueryCounter.before_cursor_execute)
+
+
+# record latency (and number of database queries) of a block under the name <name>, executed by <obj> (see
+# <display_mode>)
+# --------------------------------------------------------------------------------------------------------------------
+@contextmanager
+def record(name, obj=None):
+
+    if not REPORT:
+        yield
+        return
+
+    counter = QueryCounter()
+    start = perf_counter()
+    try:
+        with counter:
+            yield
+    finally:
+        records.append({
+            'app': 'cem',
+            'mode': display_mode(obj),
+            'name': name,
+            'seconds': perf_counter() - start,
+            'queries': counter.count if engine is not None else None
+        })
+
+
+# decorator recording each call of a function or method
+# --------------------------------------------------------------------------------------------------------------------
+def timed(name):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with record(name, args[0] if args else None):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# page mixin recording each GET and POST request of a page
+# --------------------------------------------------------------------------------------------------------------------
+class TimedPage:
+
+    def get(self, *args, **kwargs):
+        with record(type(self).__name__ + '.get', self):
+            return super().get(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        with record(type(self).__name__ + '.post', self):
+            return super().post(*args, **kwargs)
+
+
+# write records to <REPORT> when the process exits
+# --------------------------------------------------------------------------------------------------------------------
+@atexit.register
+def write_records():
+    if REPORT and records:
+        with open(REPORT, 'a') as f:
+            for r in records:
+                f.write(json.dumps(r) + '\n')
@@ -0,0 +1,139 @@
+import argparse
+import csv
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# ******************************************************************************************************************** #
+# *** SCHEMA
+# ******************************************************************************************************************** #
+
+# options "A" and "B" are dictionary-encoded against a fixed dictionary, such that all chunks share the same dictionary
+# (which is required by the Arrow IPC file format)
+# --------------------------------------------------------------------------------------------------------------------
+OPTIONS = pa.array(['A', 'B'])
+OPTION = pa.dictionary(pa.int8(), pa.string())
+
+# types of the columns of the custom export (see <custom_export> in models.py); other columns are stored as strings
+# seeds are unsigned, as <payment_seed> is drawn from 64 random bits
+# --------------------------------------------------------------------------------------------------------------------
+TYPES = {
+    'session':               pa.string(),
+    'participant':           pa.string(),
+    'round_number':          pa.int16(),
+    'payment_seed':          pa.uint64(),
+    'order_seed':            pa.uint64(),
+    'index':                 pa.int16(),
+    'position':              pa.int16(),
+    'probability':           pa.float64(),
+    'lottery_hi':            pa.float64(),
+    'lottery_lo':            pa.float64(),
+    'sure_payoff':           pa.float64(),
+    'option':                OPTION,
+    'to_pay':                pa.bool_(),
+    'random_draw':           pa.int16(),
+    'option_to_pay':         OPTION,
+    'inconsistent':          pa.bool_(),
+    'switching_row':         pa.int16(),
+    'ce_lower':              pa.float64(),
+    'ce_upper':              pa.float64(),
+    'ce_midpoint':           pa.float64(),
+    'risk_premium':          pa.float64(),
+    'indifference_lower':    pa.float64(),
+    'indifference_upper':    pa.float64(),
+    'indifference_midpoint': pa.float64(),
+    'payoff':                pa.float64(),
+}
+
+
+# schema of an export with column names <header>
+# --------------------------------------------------------------------------------------------------------------------
+def schema(header):
+    return pa.schema([(name, TYPES.get(name, pa.string())) for name in header])
+
+
+# column of type <dtype> from <values>, i.e. either values of the export or strings read from a csv file (with
+# missing values as None or '')
+# --------------------------------------------------------------------------------------------------------------------
+def column(values, dtype):
+
+    values = [None if v is None or v == '' else v for v in values]
+
+    if dtype == OPTION:
+        indices = pa.array([None if v is None else 0 if v == 'A' else 1 for v in values], pa.int8())
+        return pa.DictionaryArray.from_arrays(indices, OPTIONS)
+    if dtype == pa.bool_():
+        return pa.array([None if v is None else bool(int(v)) for v in values], dtype)
+    if pa.types.is_integer(dtype):
+        return pa.array([None if v is None else int(v) for v in values], dtype)
+    if pa.types.is_floating(dtype):
+        return pa.array([None if v is None else float(v) for v in values], dtype)
+
+    return pa.array([None if v is None else str(v) for v in values], dtype)
+
+
+# ******************************************************************************************************************** #
+# *** EXPORT
+# ******************************************************************************************************************** #
+
+# write the rows of an export to <path>, i.e. an Arrow IPC file (uncompressed, such that it can be memory-mapped) or,
+# if <path> ends with '.parquet', a Parquet file; the first row is the header
+# <rows> is either the generator of the custom export, e.g. write(custom_export(players), path) in an oTree shell, or
+# the rows of a csv export; rows are written in chunks of <chunk_size> rows, such that the memory footprint does not
+# grow with the number of participants
+# --------------------------------------------------------------------------------------------------------------------
+def write(rows, path, chunk_size=65536):
+
+    rows = iter(rows)
+    header = next(rows)
+    types = schema(header)
+    parquet = str(path).endswith('.parquet')
+
+    writer = pq.ParquetWriter(path, types) if parquet else pa.ipc.new_file(path, types)
+    with writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                writer.write_batch(batch(chunk, types))
+                chunk = []
+        if chunk:
+            writer.write_batch(batch(chunk, types))
+
+
+# record batch of <rows> with schema <types>
+# --------------------------------------------------------------------------------------------------------------------
+def batch(rows, types):
+    columns = [column(values, field.type) for values, field in zip(zip(*rows), types)]
+    return pa.record_batch(columns, schema=types)
+
+
+# read the exports at <paths> into a single table; Arrow IPC files are memory-mapped, such that columns reference the
+# mapped file without copying, while Parquet files are decoded into memory
+# --------------------------------------------------------------------------------------------------------------------
+def read(*paths):
+
+    tables = []
+    for path in paths:
+        if str(path).endswith('.parquet'):
+            tables.append(pq.read_table(path, memory_map=True))
+        else:
+            with pa.memory_map(str(path)) as source:
+                tables.append(pa.ipc.open_file(source).read_all())
+
+    return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+
+# ******************************************************************************************************************** #
+# *** MAIN
+# ******************************************************************************************************************** #
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Convert the custom export of a session to a columnar file.')
+    parser.add_argument('path')
+    parser.add_argument('--output', default='cem_results.arrow')
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    args = parser.parse_args()
+
+    with open(args.path, newline='', encoding='utf-8-sig') as f:
+        write(csv.reader(f), args.output, args.chunk_size)
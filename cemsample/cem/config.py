@@ -1,13 +1,14 @@
-# <imports>
-from otree.api import Currency as c
-from otree.constants import BaseConstants
-# </imports>
-
-
 # ******************************************************************************************************************** #
 # *** CLASS CONSTANTS *** #
 # ******************************************************************************************************************** #
-class Constants(BaseConstants):
+# config.py does not import oTree, such that offline tools (e.g. <simulate.py>, <estimate.py>) can read the parameters
+# without an oTree installation; models.py derives oTree's (read-only) <Constants> from this class
+class Constants:
+
+    # note that the parameters below can be overridden per session by adding them to the respective entry of
+    # SESSION_CONFIGS in settings.py (e.g. <variation='probability'>), except for <one_choice_per_page>, <bisection>,
+    # <packed_choices>, <submit_switching_row>, and <max_num_choices>, which determine the rounds, pages, and model
+    # fields of the app
 
     # ---------------------------------------------------------------------------------------------------------------- #
     # --- Task-specific Settings --- #
@@ -22,6 +23,7 @@ class Constants(BaseConstants):
 
     # number (n) of choices with <i = 1, 2, ..., n>
     # <num_choices> determines how many choices between a lottery and a sure payoff shall be implemented
+    # the list holds at most 31 choices
     num_choices = 25
 
     # "high" and "low" payoffs (in currency units set in settings.py) of the lottery "option A"
@@ -75,6 +77,22 @@ class Constants(BaseConstants):
     # if <one_choice_per_page = False>, all <num_choices> choices are displayed in a table on one page
     one_choice_per_page = False
 
+    # show each lottery pair on a separate screen within a single page
+    # if <paginated = True>, the choices are shown one at a time (similar to <one_choice_per_page = True>), but all
+    # choices are part of a single page and round; the next choice is displayed without reloading the page
+    # if <paginated = False>, the display of choices is determined by <one_choice_per_page>
+    # note that <paginated> is only implemented if <one_choice_per_page = False>
+    paginated = False
+
+    # elicit switching row by bisection
+    # if <bisection = True>, the choices are shown one at a time, with each choice being picked such that it halves the
+    # range of possible switching rows, i.e. about log2(<num_choices>) choices are made rather than <num_choices>
+    # the choices implied by the elicited switching row are filled in for all remaining choices (and are used for
+    # determining the payoff), such that choices are consistent by construction
+    # if <bisection = False>, all <num_choices> choices are displayed
+    # note that <bisection> is only implemented if <one_choice_per_page = False>
+    bisection = False
+
     # order choices between lottery pairs randomly
     # if <random_order = True>, the ordering of binary decisions is randomized for display
     # if <random_order = False>, binary choices are listed in ascending order of the probability of the "high" outcome
@@ -87,7 +105,7 @@ class Constants(BaseConstants):
     enforce_consistency = True
 
     # show progress bar
-    # if <progress_bar = True> and <one_choice_per_page = True>, a progress bar is rendered
+    # if <progress_bar = True> and <one_choice_per_page = True> or <paginated = True>, a progress bar is rendered
     # if <progress_bar = False>, no information with respect to the advance within the task is displayed
     # the progress bar graphically depicts the advance within the task in terms of how many decision have been made
     # further, information in terms of "page x out of <num_choices>" (with x denoting the current choice) is provided
@@ -103,6 +121,45 @@ class Constants(BaseConstants):
     # if <results = False>, the template "Decision.html" will not be rendered
     results = False
 
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # --- Data Storage and Settlement --- #
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    # settle payoffs of all participants in a single batch
+    # if <batch_settlement = True>, payoffs are not determined on each participant's final submit but for all
+    # participants in the session at once on a wait page that is displayed after all decisions have been made
+    # if <batch_settlement = False>, each participant's payoff is determined when submitting her final decision
+    batch_settlement = False
+
+    # settle choices after the final decision has been submitted
+    # if <deferred_settlement = True>, submitting the final decision only stores the choices; consistency, switching
+    # row, and payoff are determined off the request path by the page "Results" (via its live method, with the results
+    # being displayed once settled) or, if <batch_settlement = True>, on the wait page settling all participants
+    # if <deferred_settlement = False>, choices are settled when submitting the final decision
+    # note that <deferred_settlement> requires <results = True> or <batch_settlement = True>
+    deferred_settlement = False
+
+    # store all choices in a single column
+    # if <packed_choices = True>, the choices are stored as a single string (e.g. "AAABBBBBBB") in the model field
+    # <choices_packed>, with the i-th character denoting the option chosen in the choice with index i
+    # if <packed_choices = False>, each choice is stored in a separate model field <choice_i>
+    # note that <packed_choices> is only implemented if <one_choice_per_page = False>
+    packed_choices = False
+
+    # submit the switching row only
+    # if <submit_switching_row = True>, the list of choices posts the switching row (i.e. the row of the first "B"
+    # choice) as a single integer stored in the model field <switching_row>; the choices are implied by the switching
+    # row, such that model fields <choice_i> are not created
+    # if <submit_switching_row = False>, the option chosen in each choice is submitted
+    # note that <submit_switching_row> requires <enforce_consistency = True> and <random_order = False> and is only
+    # implemented if <one_choice_per_page = False>, <bisection = False>, and <packed_choices = False>
+    submit_switching_row = False
+
+    # maximum number of choices
+    # model fields <choice_i> are created for i = 1, 2, ..., <max_num_choices>
+    # sessions overriding <num_choices> in SESSION_CONFIGS may use at most <max_num_choices> choices
+    max_num_choices = num_choices
+
     # ---------------------------------------------------------------------------------------------------------------- #
     # --- oTree Settings (Don't Modify) --- #
     # ---------------------------------------------------------------------------------------------------------------- #
@@ -0,0 +1,363 @@
+import random
+from functools import lru_cache
+from collections import namedtuple
+
+
+# the core logic of the task, i.e. the list of choices, the encoding of choices, consistency, switching rows, and
+# settlement, independent of oTree and Django; <models.py> wraps these functions for the database models, and offline
+# jobs (e.g. <simulate.py>, <estimate.py>) use the batch functions, which take arrays with one entry per player
+# numpy is only imported by the batch functions, such that the module itself imports in a few milliseconds
+
+
+# ******************************************************************************************************************** #
+# *** LIST OF CHOICES
+# ******************************************************************************************************************** #
+
+# list of choices, i.e. index, form field, probability of outcome "high" (in %), high and low lottery payoff, and sure
+# payoff per choice; the parameter given by <variation> changes by <step_size> from one choice to the next
+# payoffs are returned as numbers, <models.py> converts them to currency
+# --------------------------------------------------------------------------------------------------------------------
+def build_table(variation, num_choices, probability, lottery_hi, lottery_lo, sure_payoff, step_size):
+
+    indices = list(range(1, num_choices + 1))
+    steps = [(k - 1) * step_size for k in indices]
+
+    form_fields = ['choice_' + str(k) for k in indices]
+    probabilities = [probability + s if variation == 'probability' else probability for s in steps]
+    lottery_his = [lottery_hi + s if variation == 'lottery_hi' else lottery_hi for s in steps]
+    lottery_los = [lottery_lo - s if variation == 'lottery_lo' else lottery_lo for s in steps]
+    sure_payoffs = [sure_payoff + s if variation == 'sure_payoff' else sure_payoff for s in steps]
+
+    return tuple(zip(indices, form_fields, probabilities, lottery_his, lottery_los, sure_payoffs))
+
+
+# display order of the choices with indices 1, ..., <num_rows> given the seed <seed>
+# the order is a random permutation that can be reproduced from the seed, or the order of indices if <seed> is None
+# --------------------------------------------------------------------------------------------------------------------
+def display_order(num_rows, seed=None):
+    order = list(range(1, num_rows + 1))
+    if seed is not None:
+        random.Random(seed).shuffle(order)
+    return tuple(order)
+
+
+# ******************************************************************************************************************** #
+# *** CHOICES
+# ******************************************************************************************************************** #
+
+# choices made are represented by a bitmask with bit <k - 1> set if option "A" has been chosen in the choice with
+# index <k>
+
+# bitmask of the options ("A" or "B") chosen in the choices with indices <indices>
+# --------------------------------------------------------------------------------------------------------------------
+def choices_mask(indices, options):
+    return sum(1 << (k - 1) for k, option in zip(indices, options) if option == 'A')
+
+
+# option chosen in the choice with index <index>
+# --------------------------------------------------------------------------------------------------------------------
+def option(mask, index):
+    return 'A' if mask >> (index - 1) & 1 else 'B'
+
+
+# encode bitmask of choices made as string of options (in the order of indices), e.g. "AAABBBBBBB"
+# --------------------------------------------------------------------------------------------------------------------
+def pack_choices(mask, num_choices):
+    return ''.join('A' if mask >> k & 1 else 'B' for k in range(num_choices))
+
+
+# decode string of options (in the order of indices) into bitmask of choices made
+# --------------------------------------------------------------------------------------------------------------------
+def unpack_choices(packed):
+    return int(packed[::-1].replace('A', '1').replace('B', '0'), 2) if packed else 0
+
+
+# ******************************************************************************************************************** #
+# *** CONSISTENCY AND SWITCHING ROW
+# ******************************************************************************************************************** #
+
+# choices are consistent if all "A" choices precede all "B" choices, i.e. if the bitmask of choices made is of the
+# form 2^k - 1 (with k denoting the number of "A" choices)
+# --------------------------------------------------------------------------------------------------------------------
+def is_consistent(mask):
+    return mask & (mask + 1) == 0
+
+
+# switching row, i.e. the row number of the first "B" choice (None if choices are inconsistent)
+# --------------------------------------------------------------------------------------------------------------------
+def switching_row(mask):
+    return mask.bit_length() + 1 if is_consistent(mask) else None
+
+
+# ******************************************************************************************************************** #
+# *** BISECTION
+# ******************************************************************************************************************** #
+
+# the switching row is known to lie in [lo, hi]; each answer to the choice with index (lo + hi) // 2 halves the range
+
+# initial range of possible switching rows
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_start(num_rows):
+    return [1, num_rows + 1]
+
+
+# next choice to ask (None if the switching row has been elicited)
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_index(lo, hi):
+    return (lo + hi) // 2 if lo < hi else None
+
+
+# update range of possible switching rows given the answer <answer> to the choice with index <index>
+# answers to other choices than the one asked for are ignored
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_step(lo, hi, index, answer):
+    if index is None or index != bisection_index(lo, hi) or answer not in ['A', 'B']:
+        return lo, hi
+    return (index + 1, hi) if answer == 'A' else (lo, index)
+
+
+# bitmask of choices implied by the switching row <row>, i.e. "A" above and "B" from the switching row onwards
+# --------------------------------------------------------------------------------------------------------------------
+def switching_mask(row):
+    return (1 << (row - 1)) - 1
+
+
+# ******************************************************************************************************************** #
+# *** SETTLEMENT
+# ******************************************************************************************************************** #
+
+# payoff if option <option> has been chosen in the decision to pay <row> (a row of the list of choices)
+# option "A" pays the "high" lottery outcome if the random draw is lower than or equal to the probability (in %) and
+# the "low" outcome otherwise; option "B" pays the sure payoff
+# --------------------------------------------------------------------------------------------------------------------
+def payoff(option, row, random_draw, endowment):
+    probability, lottery_hi, lottery_lo, sure_payoff = row[2:6]
+    if option == 'A':
+        return endowment + (lottery_hi if random_draw <= probability else lottery_lo)
+    return endowment + sure_payoff
+
+
+# ******************************************************************************************************************** #
+# *** CERTAINTY EQUIVALENTS
+# ******************************************************************************************************************** #
+
+# position of the parameter given by <variation> in a row of the list of choices
+# --------------------------------------------------------------------------------------------------------------------
+VARIATION_COLUMN = {'probability': 2, 'lottery_hi': 3, 'lottery_lo': 4, 'sure_payoff': 5}
+
+
+# results implied by a switching row, i.e. the interval of the varied parameter for which the lottery (option "A")
+# and the sure payoff (option "B") are indifferent (<indifference_*>), the certainty equivalent of the lottery (<ce_*>),
+# and the risk premium, i.e. the expected value of the lottery minus its certainty equivalent
+# --------------------------------------------------------------------------------------------------------------------
+CertaintyEquivalent = namedtuple('CertaintyEquivalent', [
+    'ce_lower', 'ce_upper', 'ce_midpoint', 'risk_premium',
+    'indifference_lower', 'indifference_upper', 'indifference_midpoint'
+])
+
+
+# expected value of a lottery paying <lottery_hi> with probability <probability> (in %) and <lottery_lo> otherwise
+# --------------------------------------------------------------------------------------------------------------------
+def expected_value(probability, lottery_hi, lottery_lo):
+    return probability / 100 * lottery_hi + (1 - probability / 100) * lottery_lo
+
+
+# results implied by each switching row (see <CertaintyEquivalent>)
+# a switching row <s> implies the lottery to be preferred in choice <s - 1> and the sure payoff in choice <s>, i.e. an
+# indifference value of the varied parameter in between its values in both choices, with the smaller value as the lower
+# limit whichever way the list runs; the first and the last switching row only bound one limit, the other one is
+# unbounded and denoted by None (as are the midpoint and risk premium): as the value of the lottery increases in its
+# parameters, the sure payoff in all choices bounds the indifference value of the sure payoff from above by its value
+# in the first choice (and that of a lottery parameter from below), and the lottery in all choices bounds it from
+# below by its value in the last choice (and that of a lottery parameter from above)
+# if <variation = 'sure_payoff'>, the indifference interval is the certainty equivalent interval of the lottery;
+# otherwise, the sure payoff is the certainty equivalent of the lottery with the indifference parameter (midpoint)
+# the results for switching row <s> are given by element <s - 1>; the table is built once per parameterization
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def certainty_equivalents(variation, num_choices, probability, lottery_hi, lottery_lo, sure_payoff, step_size):
+
+    table = build_table(variation, num_choices, probability, lottery_hi, lottery_lo, sure_payoff, step_size)
+    values = [None] + [row[VARIATION_COLUMN[variation]] for row in table] + [None]
+
+    equivalents = []
+    for s in range(1, num_choices + 2):
+        lottery_preferred, sure_preferred = values[s - 1], values[s]
+        if variation == 'sure_payoff':
+            lower, upper = lottery_preferred, sure_preferred
+        else:
+            lower, upper = sure_preferred, lottery_preferred
+        if lower is not None and upper is not None:
+            lower, upper = min(lower, upper), max(lower, upper)
+        midpoint = (lower + upper) / 2 if lower is not None and upper is not None else None
+
+        if variation == 'sure_payoff':
+            ce = (lower, upper, midpoint)
+            ev = expected_value(probability, lottery_hi, lottery_lo)
+            premium = ev - midpoint if midpoint is not None else None
+        else:
+            ce = (sure_payoff, sure_payoff, sure_payoff)
+            lottery = dict(probability=probability, lottery_hi=lottery_hi, lottery_lo=lottery_lo)
+            if midpoint is not None:
+                lottery[variation] = midpoint
+            premium = expected_value(**lottery) - sure_payoff if midpoint is not None else None
+
+        equivalents.append(CertaintyEquivalent(*ce, premium, lower, upper, midpoint))
+
+    return tuple(equivalents)
+
+
+# ******************************************************************************************************************** #
+# *** ADMIN REPORT
+# ******************************************************************************************************************** #
+
+# running aggregates of a session, i.e. the number of participants who completed the task and of those with
+# inconsistent choices, counts of switching rows and of completion times (in seconds), and the number and total of
+# payoffs set; aggregates are updated in O(1) per participant, and counts are keyed by strings to be stored as JSON
+# --------------------------------------------------------------------------------------------------------------------
+def report_start():
+    return {'completed': 0, 'inconsistent': 0, 'switching_rows': {}, 'seconds': {}, 'paid': 0, 'payoff_total': 0.0}
+
+
+# add a participant who completed the task with switching row <switching_row> (None if choices are inconsistent)
+# after <seconds> seconds
+# --------------------------------------------------------------------------------------------------------------------
+def report_result(report, switching_row, seconds):
+
+    report['completed'] += 1
+    if switching_row is None:
+        report['inconsistent'] += 1
+    else:
+        key = str(switching_row)
+        report['switching_rows'][key] = report['switching_rows'].get(key, 0) + 1
+
+    if seconds is not None:
+        key = str(int(seconds))
+        report['seconds'][key] = report['seconds'].get(key, 0) + 1
+
+    return report
+
+
+# add payoffs <payoffs>
+# --------------------------------------------------------------------------------------------------------------------
+def report_payoffs(report, payoffs):
+    for x in payoffs:
+        report['paid'] += 1
+        report['payoff_total'] += float(x)
+    return report
+
+
+# median of the values counted in <counts> (None if there are no values)
+# --------------------------------------------------------------------------------------------------------------------
+def counts_median(counts):
+
+    n = sum(counts.values())
+    if n == 0:
+        return None
+
+    def element(rank):
+        cumulative = 0
+        for value, count in sorted((int(k), v) for k, v in counts.items()):
+            cumulative += count
+            if cumulative > rank:
+                return value
+
+    return (element((n - 1) // 2) + element(n // 2)) / 2
+
+
+# summary of the running aggregates, i.e. the distribution of switching rows 1 to <num_rows> + 1 (as rows of
+# switching row, count, and percentage), the inconsistency rate, the median completion time, and total and mean payoff
+# --------------------------------------------------------------------------------------------------------------------
+def report_summary(report, num_rows):
+
+    completed = report['completed']
+    counts = [(s, report['switching_rows'].get(str(s), 0)) for s in range(1, num_rows + 2)]
+
+    return {
+        'completed':          completed,
+        'switching_rows':     [(s, n, n / completed * 100 if completed else 0) for s, n in counts],
+        'inconsistent':       report['inconsistent'],
+        'inconsistency_rate': report['inconsistent'] / completed * 100 if completed else None,
+        'median_seconds':     counts_median(report['seconds']),
+        'paid':               report['paid'],
+        'payoff_total':       report['payoff_total'],
+        'payoff_mean':        report['payoff_total'] / report['paid'] if report['paid'] else None
+    }
+
+
+# ******************************************************************************************************************** #
+# *** BATCH FUNCTIONS
+# ******************************************************************************************************************** #
+
+# bitmasks of choices made for a boolean array <option_a> (players x choices, in the order of indices), which is True
+# if option "A" has been chosen
+# --------------------------------------------------------------------------------------------------------------------
+def batch_masks(option_a):
+    import numpy as np
+    option_a = np.asarray(option_a, dtype=np.int64)
+    return option_a @ (np.int64(1) << np.arange(option_a.shape[-1], dtype=np.int64))
+
+
+# consistency for an array of bitmasks (1 if inconsistent, 0 otherwise)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_inconsistent(masks):
+    import numpy as np
+    masks = np.asarray(masks, dtype=np.int64)
+    return (masks & (masks + 1) != 0).astype(int)
+
+
+# switching rows for an array of bitmasks (-1 if choices are inconsistent)
+# the bit length of 2^k - 1 is given by the binary exponent of 2^k
+# --------------------------------------------------------------------------------------------------------------------
+def batch_switching_rows(masks):
+    import numpy as np
+    masks = np.asarray(masks, dtype=np.int64)
+    rows = np.frexp((masks + 1).astype(float))[1]
+    return np.where(batch_inconsistent(masks) == 0, rows, -1)
+
+
+# random draws to determine whether to pay the "high" or "low" outcome of the lotteries to pay
+# draws are uniformly distributed on {1, ..., 100}, such that the "high" outcome is paid with the probability (in %)
+# of the decision to pay (see <payoff>)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_draw(num_players, rng=None):
+    import numpy as np
+    rng = np.random.default_rng() if rng is None else rng
+    return rng.integers(1, 101, size=num_players)
+
+
+# decisions to pay and random draws of <num_players> players, drawn at once from the seed <seed>
+# indices to pay are uniformly distributed on <indices> and random draws are distributed as in <batch_draw>; all
+# payments of a session can be reproduced offline from its seed (with players in the order of <id_in_subsession>)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_payments(num_players, indices, seed=None):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    index_to_pay = rng.choice(np.asarray(indices), size=num_players)
+    return index_to_pay, batch_draw(num_players, rng)
+
+
+# options chosen in the decisions to pay
+# returns True for each player who has chosen option "A" in the decision with index <index_to_pay>
+# --------------------------------------------------------------------------------------------------------------------
+def batch_chosen_a(masks, index_to_pay):
+    import numpy as np
+    return (np.asarray(masks, dtype=np.int64) >> (np.asarray(index_to_pay, dtype=np.int64) - 1)) & 1 == 1
+
+
+# payoffs for a batch of players
+# <index_to_pay>, <option_a>, and <draws> are arrays with one entry per player, where <option_a> is True if the
+# lottery (option "A") has been chosen in the decision to pay; <table> is the list of choices as returned by
+# <build_table>, i.e. rows of (index, form field, probability, lottery_hi, lottery_lo, sure payoff)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_settle(index_to_pay, option_a, draws, table, endowment):
+    import numpy as np
+
+    # probabilities and payoffs of the decisions to pay
+    rows = np.array([row[2:6] for row in table], dtype=float)[np.asarray(index_to_pay) - 1]
+    probability, lottery_hi, lottery_lo, sure_payoff = rows.T
+
+    # lottery outcome if option "A" has been chosen, sure payoff otherwise
+    lottery = np.where(np.asarray(draws) <= probability, lottery_hi, lottery_lo)
+
+    return endowment + np.where(np.asarray(option_a, dtype=bool), lottery, sure_payoff)
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import re
+import numpy as np
+from scipy.optimize import minimize
+from scipy.special import expit, log_ndtr
+from cem.config import Constants
+from cem.simulate import build_list
+
+
+# ******************************************************************************************************************** #
+# *** LIST OF CHOICES
+# ******************************************************************************************************************** #
+
+# lotteries "A" and "B" of the list of choices (in the order of indices) as final payoffs (including <endowment>) and
+# probabilities (choices x 2); option "A" denotes the lottery and option "B" the sure payoff
+# --------------------------------------------------------------------------------------------------------------------
+def build_lotteries(variation=Constants.variation, num_choices=Constants.num_choices):
+
+    indices, probabilities, lottery_hi, lottery_lo, sure_payoffs = build_list(variation, num_choices)
+    p = probabilities / 100
+
+    outcomes_a = Constants.endowment + np.column_stack([lottery_hi, lottery_lo])
+    outcomes_b = Constants.endowment + np.column_stack([sure_payoffs, sure_payoffs])
+
+    if (outcomes_a <= 0).any() or (outcomes_b <= 0).any():
+        raise ValueError('CRRA utility requires positive payoffs, i.e. <endowment> needs to cover potential losses')
+
+    return indices, (outcomes_a, np.column_stack([p, 1 - p])), (outcomes_b, np.column_stack([p, 1 - p]))
+
+
+# ******************************************************************************************************************** #
+# *** UTILITY
+# ******************************************************************************************************************** #
+
+# CRRA utility u(x) = (x^(1 - r) - 1) / (1 - r), with u(x) = ln(x) for r = 1, and its derivative with respect to r
+# the utility is evaluated by a series expansion in the neighbourhood of r = 1 (to avoid cancellation)
+# --------------------------------------------------------------------------------------------------------------------
+def crra(x, r):
+
+    t = 1 - r
+    log_x = np.log(x)
+    small = np.abs(t) < 1e-3
+    t_safe = np.where(small, 1, t)
+    tl = t_safe * log_x
+
+    u = np.where(small, log_x + t * log_x ** 2 / 2 + t ** 2 * log_x ** 3 / 6, np.expm1(tl) / t_safe)
+    du_dt = np.where(
+        small,
+        log_x ** 2 / 2 + t * log_x ** 3 / 3 + t ** 2 * log_x ** 4 / 8,
+        (tl * np.exp(tl) - np.expm1(tl)) / t_safe ** 2
+    )
+
+    return u, -du_dt
+
+
+# expected utility of lotteries (<outcomes>, <probabilities>) and its derivative with respect to r
+# <r> is broadcast against the choices, i.e. for subject-specific coefficients <r> has shape (subjects x 1)
+# --------------------------------------------------------------------------------------------------------------------
+def expected_utility(lottery, r):
+    outcomes, probabilities = lottery
+    u, du = crra(outcomes, r[..., None])
+    return (probabilities * u).sum(axis=-1), (probabilities * du).sum(axis=-1)
+
+
+# log certainty equivalent of lotteries (<outcomes>, <probabilities>) and its derivative with respect to r
+# ln CE = ln E[x^(1 - r)] / (1 - r), with ln CE = E[ln x] for r = 1
+# --------------------------------------------------------------------------------------------------------------------
+def log_certainty_equivalent(lottery, r):
+
+    outcomes, probabilities = lottery
+    t = 1 - r[..., None]
+    log_x = np.log(outcomes)
+    small = np.abs(t[..., 0]) < 1e-3
+    t_safe = np.where(np.abs(t) < 1e-3, 1, t)
+
+    # cumulants of ln x for the neighbourhood of r = 1
+    mean = (probabilities * log_x).sum(axis=-1)
+    var = (probabilities * (log_x - mean[..., None]) ** 2).sum(axis=-1)
+    skew = (probabilities * (log_x - mean[..., None]) ** 3).sum(axis=-1)
+
+    # E[x^t] and its derivative with respect to t
+    w = probabilities * np.exp(t_safe * log_x)
+    m = w.sum(axis=-1)
+    dm = (w * log_x).sum(axis=-1)
+    t_safe = t_safe[..., 0]
+
+    log_ce = np.where(small, mean + (1 - r) * var / 2 + (1 - r) ** 2 * skew / 6, np.log(m) / t_safe)
+    dlog_ce_dt = np.where(small, var / 2 + (1 - r) * skew / 3, (dm / m * t_safe - np.log(m)) / t_safe ** 2)
+
+    return log_ce, -dlog_ce_dt
+
+
+# ******************************************************************************************************************** #
+# *** LIKELIHOOD
+# ******************************************************************************************************************** #
+
+# index of the probability of choosing option "A" and its derivative with respect to r
+# 'fechner': P(A) = Phi((EU(A) - EU(B)) / (mu * (u(max) - u(min)))), i.e. Fechner noise with contextual utility
+# 'luce':    P(A) = CE(A)^(1/mu) / (CE(A)^(1/mu) + CE(B)^(1/mu)), i.e. the Luce ratio applied to certainty equivalents
+# --------------------------------------------------------------------------------------------------------------------
+def choice_index(model, r, lottery_a, lottery_b):
+
+    if model == 'fechner':
+        eu_a, deu_a = expected_utility(lottery_a, r)
+        eu_b, deu_b = expected_utility(lottery_b, r)
+        outcomes = np.concatenate([lottery_a[0], lottery_b[0]], axis=-1)
+        u_max, du_max = crra(outcomes.max(axis=-1), r)
+        u_min, du_min = crra(outcomes.min(axis=-1), r)
+        d, dd = eu_a - eu_b, deu_a - deu_b
+        s, ds = u_max - u_min, du_max - du_min
+        return d / s, (dd * s - d * ds) / s ** 2
+
+    if model == 'luce':
+        ce_a, dce_a = log_certainty_equivalent(lottery_a, r)
+        ce_b, dce_b = log_certainty_equivalent(lottery_b, r)
+        return ce_a - ce_b, dce_a - dce_b
+
+    raise ValueError("model must be 'fechner' or 'luce'")
+
+
+# log-likelihood of the choices <y> (subjects x choices, 1 for "A", 0 for "B", nan if missing) and its gradient
+# with respect to r and ln(mu) (both of shape subjects x 1 or 1 x 1 for pooled estimation)
+# --------------------------------------------------------------------------------------------------------------------
+def log_likelihood(model, r, log_mu, y, lottery_a, lottery_b):
+
+    observed = ~np.isnan(y)
+    a = np.where(observed, y, 0)
+    b = np.where(observed, 1 - y, 0)
+
+    v, dv = choice_index(model, r, lottery_a, lottery_b)
+    z = v / np.exp(log_mu)
+    dz = dv / np.exp(log_mu)
+
+    if model == 'fechner':
+        log_p, log_q = log_ndtr(z), log_ndtr(-z)
+        log_density = -z ** 2 / 2 - np.log(2 * np.pi) / 2
+        dll_dz = a * np.exp(log_density - log_p) - b * np.exp(log_density - log_q)
+    else:
+        log_p, log_q = -np.logaddexp(0, -z), -np.logaddexp(0, z)
+        dll_dz = a - (a + b) * expit(z)
+
+    ll = a * log_p + b * log_q
+    return ll.sum(axis=-1), (dll_dz * dz).sum(axis=-1), -(dll_dz * z).sum(axis=-1)
+
+
+# ******************************************************************************************************************** #
+# *** ESTIMATION
+# ******************************************************************************************************************** #
+
+# maximum likelihood estimates of the CRRA coefficient r and the noise parameter mu
+# if <pooled = True>, a single (r, mu) is fitted to all subjects; otherwise, (r, mu) are fitted per subject
+# per-subject likelihoods are separable, such that all subjects are fitted simultaneously by a single optimization
+# over the stacked parameters; estimates are restricted to <r_bounds> and <mu_bounds>
+# --------------------------------------------------------------------------------------------------------------------
+def fit(y, model='fechner', pooled=False, r_bounds=(-5, 5), mu_bounds=(1e-3, 10), lotteries=None):
+
+    y = np.asarray(y, dtype=float)
+    lottery_a, lottery_b = (lotteries or build_lotteries())[1:]
+    rows = 1 if pooled else y.shape[0]
+    data = y.reshape(1, -1) if pooled else y
+
+    # replicate lists for pooled estimation
+    if pooled:
+        lottery_a = tuple(np.tile(j, (y.shape[0], 1)) for j in lottery_a)
+        lottery_b = tuple(np.tile(j, (y.shape[0], 1)) for j in lottery_b)
+
+    def objective(theta):
+        r, log_mu = theta.reshape(2, rows, 1)
+        ll, dr, dlog_mu = log_likelihood(model, r, log_mu, data, lottery_a, lottery_b)
+        return -ll.sum(), -np.concatenate([dr, dlog_mu])
+
+    start = np.concatenate([np.full(rows, 0.3), np.full(rows, np.log(0.1))])
+    bounds = [r_bounds] * rows + [tuple(np.log(mu_bounds))] * rows
+    result = minimize(objective, start, jac=True, method='L-BFGS-B', bounds=bounds)
+
+    r, log_mu = result.x.reshape(2, rows, 1)
+    ll = log_likelihood(model, r, log_mu, data, lottery_a, lottery_b)[0]
+
+    return {
+        'r':              r[:, 0],
+        'mu':             np.exp(log_mu[:, 0]),
+        'log_likelihood': ll,
+        'num_choices':    (~np.isnan(data)).sum(axis=-1),
+        'converged':      np.full(rows, result.success)
+    }
+
+
+# ******************************************************************************************************************** #
+# *** DATA
+# ******************************************************************************************************************** #
+
+# read choices from a data export, i.e. the custom export of the app (one row per participant and decision, with
+# columns 'index' and 'option') or oTree's wide export (with columns 'cem.<round>.player.choice_<k>'); rows of the
+# same participant (e.g. if <one_choice_per_page = True>) are merged
+# returns the participant codes and an array of choices (participants x choices, 1 for "A", 0 for "B", nan if missing)
+# --------------------------------------------------------------------------------------------------------------------
+def load_choices(path, indices=None):
+
+    indices = build_lotteries()[0] if indices is None else indices
+    pattern = re.compile(r'^(?:{}\.(\d+)\.player\.)?choice_(\d+)$'.format(Constants.name_in_url))
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+
+        participant = header.index('participant.code' if 'participant.code' in header else 'participant')
+        columns = [(j, int(m.group(2))) for j, m in ((j, pattern.match(h)) for j, h in enumerate(header)) if m]
+        position = {k: i for i, k in enumerate(indices)}
+
+        # long format: the index of the decision is given by the row
+        long = 'index' in header and 'option' in header
+        if long:
+            index, option = header.index('index'), header.index('option')
+
+        codes, choices = {}, []
+        for row in reader:
+            code = row[participant]
+            if code not in codes:
+                codes[code] = len(choices)
+                choices.append(np.full(len(indices), np.nan))
+            for j, k in ([(option, int(row[index]))] if long else columns):
+                if row[j] in ('A', 'B') and k in position:
+                    choices[codes[code]][position[k]] = 1 if row[j] == 'A' else 0
+
+    return list(codes), np.array(choices).reshape(-1, len(indices))
+
+
+# ******************************************************************************************************************** #
+# *** MAIN
+# ******************************************************************************************************************** #
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Estimate CRRA preferences from the choices in a session export.')
+    parser.add_argument('path')
+    parser.add_argument('--model', choices=['fechner', 'luce'], default='fechner')
+    parser.add_argument('--pooled', action='store_true')
+    parser.add_argument('--output', default='cem_estimates.csv')
+    args = parser.parse_args()
+
+    participants, y = load_choices(args.path)
+    estimates = fit(y, args.model, args.pooled)
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['participant'] + list(estimates))
+        labels = ['pooled'] if args.pooled else participants
+        writer.writerows(zip(labels, *(column.tolist() for column in estimates.values())))
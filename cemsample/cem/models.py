@@ -2,9 +2,11 @@ from otree.api import (
     models, widgets, BaseConstants, BaseSubsession, BaseGroup, BasePlayer,
     Currency as c, currency_range
 )
-from cem.config import *
+from cem import config
 import random
-from random import randrange
+from functools import lru_cache
+from collections import namedtuple
+from . import core, benchmark
 
 
 author = 'Felix Holzmeister'
@@ -15,6 +17,138 @@ as well as variations thereof suggested by Bruner (2009) and Gächter et al. (20
 """
 
 
+# ******************************************************************************************************************** #
+# *** CONSTANTS
+# ******************************************************************************************************************** #
+
+# parameters set in config.py as oTree constants
+# --------------------------------------------------------------------------------------------------------------------
+class Constants(BaseConstants, config.Constants):
+    pass
+
+
+# ******************************************************************************************************************** #
+# *** CHOICE TABLE
+# ******************************************************************************************************************** #
+
+# list of choices for a given parameterization
+# the list is built once per parameterization and shared by all participants; participants only store the seed of the
+# order in which the indices are displayed (<cem_seed>)
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def choice_table(variation, num_choices, probability, lottery_hi, lottery_lo, sure_payoff, step_size):
+
+    # create list of indices, form fields, probabilities, and payoffs
+    # ----------------------------------------------------------------------------------------------------------------
+    rows = core.build_table(variation, num_choices, probability, lottery_hi, lottery_lo, sure_payoff, step_size)
+
+    # convert payoffs to currency
+    # ----------------------------------------------------------------------------------------------------------------
+    return tuple((i, f, p, c(hi), c(lo), c(sp)) for i, f, p, hi, lo, sp in rows)
+
+
+# participant's view on the list of choices, i.e. the list in display order (<choices>), the indices and form fields
+# in display order (<indices>, <form_fields>), and the display position of each index (<position>, with the position
+# of index <k> given by <position[k - 1]>)
+# --------------------------------------------------------------------------------------------------------------------
+ChoiceView = namedtuple('ChoiceView', ['choices', 'indices', 'form_fields', 'position'])
+
+
+# participant's view for a given list of choices (key <table>) and seed of the display order (<cem_seed>)
+# views are cached such that pages do not need to re-arrange the list on each request
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def choice_view(table, seed):
+
+    rows = choice_table(*table)
+    order = core.display_order(len(rows), seed)
+    choices = tuple(rows[k - 1] for k in order)
+
+    position = [None] * len(rows)
+    for i, k in enumerate(order, start=1):
+        position[k - 1] = i
+
+    return ChoiceView(
+        choices=choices,
+        indices=tuple(order),
+        form_fields=tuple(j[1] for j in choices),
+        position=tuple(position)
+    )
+
+
+# ******************************************************************************************************************** #
+# *** TASK SPECIFICATION
+# ******************************************************************************************************************** #
+
+# parameters of <Constants> that can be set per session by adding them to an entry of SESSION_CONFIGS in settings.py,
+# e.g. dict(name='cem_probability', app_sequence=['cem'], num_demo_participants=2, variation='probability')
+# <one_choice_per_page>, <bisection>, <packed_choices>, <submit_switching_row>, and <max_num_choices> determine the
+# rounds, pages, and model fields of the app and can only be set in config.py
+# --------------------------------------------------------------------------------------------------------------------
+PARAMETERS = (
+    'variation', 'num_choices', 'probability', 'lottery_hi', 'lottery_lo', 'sure_payoff', 'step_size', 'endowment',
+    'accept_reject', 'paginated', 'random_order', 'enforce_consistency', 'progress_bar', 'instructions', 'results',
+    'batch_settlement', 'deferred_settlement'
+)
+
+
+# task specification, i.e. the parameters of a session, the key of its list of choices (<table>), the list of choices
+# (<rows>) and its indices, and the lottery payoffs and probability formatted for templates (<labels>)
+# --------------------------------------------------------------------------------------------------------------------
+TaskSpec = namedtuple('TaskSpec', PARAMETERS + ('table', 'rows', 'indices', 'labels'))
+
+
+# key identifying the parameterization of a session, i.e. its parameters in the order of <PARAMETERS>
+# --------------------------------------------------------------------------------------------------------------------
+def spec_key(config):
+    return tuple(config.get(k, getattr(Constants, k)) for k in PARAMETERS)
+
+
+# task specification for a given parameterization
+# each distinct parameterization is compiled once and shared by all sessions, participants, and requests
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def task_spec(key):
+
+    params = dict(zip(PARAMETERS, key))
+    table = tuple(params[k] for k in [
+        'variation', 'num_choices', 'probability', 'lottery_hi', 'lottery_lo', 'sure_payoff', 'step_size'
+    ])
+    rows = choice_table(*table)
+
+    # check parameters against the rounds and model fields set up in config.py
+    # ----------------------------------------------------------------------------------------------------------------
+    if len(rows) > Constants.max_num_choices:
+        raise ValueError('num_choices exceeds max_num_choices set in config.py')
+    if len(rows) > 31:
+        raise ValueError('num_choices exceeds 31, the number of choices held by the integer field choices_made')
+    if Constants.one_choice_per_page and len(rows) != Constants.num_rounds:
+        raise ValueError('num_choices cannot be changed per session if one_choice_per_page = True')
+
+    if Constants.submit_switching_row and (params['random_order'] or not params['enforce_consistency']):
+        raise ValueError('submit_switching_row requires enforce_consistency = True and random_order = False')
+    if params['deferred_settlement'] and not (params['results'] or params['batch_settlement']):
+        raise ValueError('deferred_settlement requires results = True or batch_settlement = True')
+
+    return TaskSpec(
+        table=table,
+        rows=rows,
+        indices=tuple(j[0] for j in rows),
+        labels=(
+            ('lottery_lo', c(params['lottery_lo'])),
+            ('lottery_hi', c(params['lottery_hi'])),
+            ('probability', "{0:.1f}".format(params['probability']) + "%")
+        ),
+        **params
+    )
+
+
+# task specification of a session
+# --------------------------------------------------------------------------------------------------------------------
+def session_spec(session):
+    return task_spec(spec_key(session.config))
+
+
 # ******************************************************************************************************************** #
 # *** CLASS SUBSESSION
 # ******************************************************************************************************************** #
@@ -22,79 +156,153 @@ class Subsession(BaseSubsession):
 
     # initiate lists before session starts in round 1
     # ----------------------------------------------------------------------------------------------------------------
+    @benchmark.timed('Subsession.creating_session')
     def creating_session(self):
         if self.round_number == 1:
 
-            n = Constants.num_choices
-            for p in self.get_players():
+            # get (shared) task specification of the session
+            # --------------------------------------------------------------------------------------------------------
+            spec = self.get_spec()
+            indices = spec.indices
+            players = self.get_players()
 
-                # create list of lottery indices
-                # ----------------------------------------------------------------------------------------------------
-                indices = [j for j in range(1, n + 1)]
+            # initiate running aggregates of the admin report
+            # --------------------------------------------------------------------------------------------------------
+            self.session.cem_report = core.report_start()
 
-                # create list corresponding to form_field variables including all choices
-                # ----------------------------------------------------------------------------------------------------
-                form_fields = ['choice_' + str(k) for k in indices]
+            # draw decisions to pay and random numbers of all players at once from the session's payment seed
+            # --------------------------------------------------------------------------------------------------------
+            self.session.cem_payment_seed = random.getrandbits(64)
+            index_to_pay, draws = core.batch_payments(len(players), indices, self.session.cem_payment_seed)
 
-                # create list of probabilities
-                # ----------------------------------------------------------------------------------------------------
-                if Constants.variation == 'probability':
-                    probabilities = [Constants.probability + (k - 1) * Constants.step_size for k in indices]
-                else:
-                    probabilities = [Constants.probability for k in indices]
+            for p, k, d in zip(players, index_to_pay.tolist(), draws.tolist()):
 
-                # create list of high lottery payoffs
+                # store index/choice of binary decision to pay and random draw to determine whether to pay the "high"
+                # or "low" outcome of the lottery to pay
+                # the task state of the participant is stored in model fields of the player of round 1 (see
+                # <get_task_player>)
                 # ----------------------------------------------------------------------------------------------------
-                if Constants.variation == 'lottery_hi':
-                    lottery_hi = [c(Constants.lottery_hi + (k - 1) * Constants.step_size) for k in indices]
-                else:
-                    lottery_hi = [c(Constants.lottery_hi) for k in indices]
+                p.index_to_pay = k
+                p.choice_to_pay = 'choice_' + str(k)
+                p.random_draw = d
 
-                # create list of low lottery payoffs
+                # randomize order of lotteries if <random_order = True>
+                # only the seed of the order is stored; the order is derived from the seed when the view is built
                 # ----------------------------------------------------------------------------------------------------
-                if Constants.variation == 'lottery_lo':
-                    lottery_lo = [c(Constants.lottery_lo - (k - 1) * Constants.step_size) for k in indices]
-                else:
-                    lottery_lo = [c(Constants.lottery_lo) for k in indices]
+                p.participant.cem_seed = random.getrandbits(32) if spec.random_order else None
 
-                # create list of sure payoffs
+                # initiate bitmask for choices made
+                # bit <k - 1> is set if option "A" has been chosen in the choice with index <k>
                 # ----------------------------------------------------------------------------------------------------
-                if Constants.variation == 'sure_payoff':
-                    sure_payoffs = [c(Constants.sure_payoff + (k-1) * Constants.step_size) for k in indices]
-                else:
-                    sure_payoffs = [c(Constants.sure_payoff) for k in indices]
+                p.choices_made = 0
 
-                # create list of choices
+                # choices are settled on the final submit unless settlement is deferred
                 # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['cem_choices'] = list(
-                    zip(
-                        indices,
-                        form_fields,
-                        probabilities,
-                        lottery_hi,
-                        lottery_lo,
-                        sure_payoffs
-                    )
-                )
-
-                # randomly determine index/choice of binary decision to pay
-                # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['cem_index_to_pay'] = random.choice(indices)
-                p.participant.vars['cem_choice_to_pay'] = 'choice_' + str(p.participant.vars['cem_index_to_pay'])
+                p.settled = not spec.deferred_settlement
 
-                # randomize order of lotteries if <random_order = True>
+                # initiate start and completion time of the task (in seconds) for the admin report
                 # ----------------------------------------------------------------------------------------------------
-                if Constants.random_order:
-                    random.shuffle(p.participant.vars['cem_choices'])
+                p.participant.cem_started = None
+                p.participant.cem_seconds = None
 
-                # initiate list for choices made
+                # initiate range of possible switching rows for <bisection = True>
                 # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['cem_choices_made'] = [None for j in range(1, n + 1)]
+                p.participant.cem_bisection = core.bisection_start(len(indices))
 
             # generate random switching point for PlayerBot in tests.py
             # --------------------------------------------------------------------------------------------------------
             for participant in self.session.get_participants():
-                participant.vars['cem-bot_switching_point'] = random.randint(1, n)
+                participant.cem_switching_point = random.randint(1, spec.num_choices)
+
+    # get (cached) task specification of the session
+    # ----------------------------------------------------------------------------------------------------------------
+    def get_spec(self):
+        return session_spec(self.session)
+
+    # variables for the admin report, i.e. a summary of the running aggregates of the session
+    # the aggregates are updated as participants complete the task, such that the report does not scan all players
+    # ----------------------------------------------------------------------------------------------------------------
+    def vars_for_admin_report(self):
+        self.settle_pending()
+        summary = core.report_summary(self.session.cem_report, len(self.get_spec().indices))
+        summary['payoff_total'] = c(summary['payoff_total'])
+        summary['payoff_mean'] = c(summary['payoff_mean']) if summary['payoff_mean'] is not None else None
+        return summary
+
+    # settle players who completed the task but whose choices have not been settled via the page "Results" (if
+    # <deferred_settlement = True>), e.g. as they closed the page before it requested settlement; players are settled
+    # once the admin report is viewed, such that the report (and the export) covers all players who completed the task
+    # ----------------------------------------------------------------------------------------------------------------
+    def settle_pending(self):
+        spec = self.get_spec()
+        if not spec.deferred_settlement or spec.batch_settlement:
+            return
+        for p in self.in_round(Constants.num_rounds).get_players():
+            if p.participant.cem_seconds is not None and not p.get_task_player().settled:
+                p.settle()
+
+    # settle payoffs of all players in the session at once (if <batch_settlement = True>)
+    # ----------------------------------------------------------------------------------------------------------------
+    @benchmark.timed('Subsession.set_payoffs')
+    def set_payoffs(self):
+
+        # get player objects holding the task state (<tasks>) and the decision to pay (<players>)
+        # ------------------------------------------------------------------------------------------------------------
+        spec = self.get_spec()
+        players = self.get_players()
+        tasks = players
+
+        if Constants.one_choice_per_page:
+            rounds = {
+                s.round_number: {p.participant.id_in_session: p for p in s.get_players()}
+                for s in self.in_rounds(1, Constants.num_rounds)
+            }
+            tasks = [rounds[1][p.participant.id_in_session] for p in players]
+            players = [
+                rounds[
+                    t.get_view().position[t.index_to_pay - 1]
+                ][t.participant.id_in_session]
+                for t in tasks
+            ]
+
+        # pack decisions to pay and random draws of all players
+        # ------------------------------------------------------------------------------------------------------------
+        choice_to_pay = [t.choice_to_pay for t in tasks]
+        index_to_pay = [t.index_to_pay for t in tasks]
+        option_a = core.batch_chosen_a([t.choices_made for t in tasks], index_to_pay)
+        draws = [t.random_draw for t in tasks]
+
+        # determine payoffs
+        # ------------------------------------------------------------------------------------------------------------
+        payoffs = core.batch_settle(
+            index_to_pay,
+            option_a,
+            draws,
+            spec.rows,
+            spec.endowment
+        )
+
+        # write results to players
+        # ------------------------------------------------------------------------------------------------------------
+        for p, f, a, d, x in zip(players, choice_to_pay, option_a, draws, payoffs.tolist()):
+            p.random_draw = d
+            p.choice_to_pay = f
+            p.option_to_pay = 'A' if a else 'B'
+            p.payoff = x
+            p.participant.cem_payoff = p.payoff
+
+        # add payoffs to the admin report
+        # ------------------------------------------------------------------------------------------------------------
+        self.session.cem_report = core.report_payoffs(self.session.cem_report, payoffs.tolist())
+
+        # determine consistency and switching rows if settlement has been deferred
+        # ------------------------------------------------------------------------------------------------------------
+        if spec.deferred_settlement:
+            for p, t in zip(self.get_players(), tasks):
+                p.set_consistency()
+                p.set_switching_row()
+                p.add_to_report()
+                t.settled = True
 
 
 # ******************************************************************************************************************** #
@@ -111,67 +319,172 @@ class Player(BasePlayer):
 
     # add model fields to class player
     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-    for j in range(1, Constants.num_choices + 1):
-        locals()['choice_' + str(j)] = models.StringField()
-    del j
+    if Constants.packed_choices:
+        choices_packed = models.StringField()
+    elif not Constants.submit_switching_row:
+        for j in range(1, Constants.max_num_choices + 1):
+            locals()['choice_' + str(j)] = models.StringField()
+        del j
 
     random_draw = models.IntegerField()
     choice_to_pay = models.StringField()
     option_to_pay = models.StringField()
     inconsistent = models.IntegerField()
     switching_row = models.IntegerField()
+    ce_lower = models.FloatField()
+    ce_upper = models.FloatField()
+    ce_midpoint = models.FloatField()
+    risk_premium = models.FloatField()
+    indifference_lower = models.FloatField()
+    indifference_upper = models.FloatField()
+    indifference_midpoint = models.FloatField()
+
+    # task state of the participant, i.e. the decision to pay and random draw (set in creating_session), the bitmask of
+    # choices made (bit <k - 1> is set if option "A" has been chosen in the choice with index <k>), and whether choices
+    # have been settled; the state is read and updated on (almost) every request and stored in typed columns of the
+    # player of round 1 (see <get_task_player>), whose fields hold the results of the task if choices are settled in
+    # the same round
+    index_to_pay = models.IntegerField()
+    choices_made = models.IntegerField()
+    settled = models.BooleanField()
+
+    # get (cached) task specification of the session
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_spec(self):
+        return session_spec(self.session)
+
+    # get player holding the task state of the participant, i.e. the player of round 1, which is shared by all rounds
+    # if <one_choice_per_page = True>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_task_player(self):
+        return self if self.round_number == 1 else self.in_round(1)
+
+    # get (cached) view on the list of choices in the order displayed to the participant
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_view(self):
+        return choice_view(self.get_spec().table, self.participant.cem_seed)
+
+    # get list of choices in the order displayed to the participant
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_choices(self):
+        return self.get_view().choices
+
+    # option submitted in the choice with index <index>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_choice(self, index):
+        if Constants.packed_choices:
+            return self.choices_packed[index - 1] if index <= len(self.choices_packed or '') else None
+        if Constants.submit_switching_row:
+            if self.switching_row is None or index > len(self.get_spec().indices):
+                return None
+            return 'A' if index < self.switching_row else 'B'
+        return getattr(self, 'choice_' + str(index))
+
+    # set all choices implied by the bitmask <mask>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def set_choices(self, mask):
+        indices = self.get_spec().indices
+        if Constants.packed_choices:
+            self.choices_packed = core.pack_choices(mask, len(indices))
+        else:
+            for k in indices:
+                setattr(self, 'choice_' + str(k), 'A' if mask >> (k - 1) & 1 else 'B')
+
+    # elicit switching row by bisection (live method of page Decision if <bisection = True>)
+    # the switching row is known to lie in [lo, hi]; each answer to the choice with index (lo + hi) // 2 halves it
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def live_bisection(self, data):
+
+        # update range of possible switching rows given the answer to the current choice
+        # ------------------------------------------------------------------------------------------------------------
+        lo, hi = core.bisection_step(*self.participant.cem_bisection, data.get('index'), data.get('answer'))
+        self.participant.cem_bisection = [lo, hi]
+
+        # send next choice to display
+        # ------------------------------------------------------------------------------------------------------------
+        index = core.bisection_index(lo, hi)
+        if index is not None:
+            return {self.id_in_group: {'index': index}}
+
+        # set choices implied by the switching row, i.e. "A" above and "B" from the switching row onwards
+        # ------------------------------------------------------------------------------------------------------------
+        self.get_task_player().choices_made = core.switching_mask(lo)
+        return {self.id_in_group: {'done': True}}
+
+    # settle choices, i.e. determine consistency, switching row, and payoff (if <deferred_settlement = True>)
+    # in case of <one_choice_per_page = True>, the payoff is set in the round of the decision to pay
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    @benchmark.timed('Player.settle')
+    def settle(self):
+
+        task = self.get_task_player()
+        if task.settled:
+            return
+
+        self.set_consistency()
+        self.set_switching_row()
+        self.add_to_report()
+
+        if not self.get_spec().batch_settlement:
+            if Constants.one_choice_per_page:
+                self.in_round(self.get_view().position[task.index_to_pay - 1]).set_payoffs()
+            else:
+                self.set_payoffs()
+
+        task.settled = True
+
+    # settle choices once the page "Results" has been loaded (live method of page Results, if
+    # <deferred_settlement = True>)
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def live_settlement(self, data):
+        if not self.get_spec().deferred_settlement:
+            return
+        self.settle()
+        return {self.id_in_group: {'settled': True}}
 
     # set player's payoff
     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
     def set_payoffs(self):
 
         # random draw to determine whether to pay the "high" or "low" outcome of the randomly picked lottery
+        # (drawn in creating_session and stored in the task state of the player of round 1)
         # ------------------------------------------------------------------------------------------------------------
-        self.random_draw = randrange(1, 100)
+        task = self.get_task_player()
+        self.random_draw = task.random_draw
 
-        # set <choice_to_pay> to participant.var['choice_to_pay'] determined creating_session
+        # set <choice_to_pay> to the decision to pay determined in creating_session
         # ------------------------------------------------------------------------------------------------------------
-        self.choice_to_pay = self.participant.vars['cem_choice_to_pay']
+        self.choice_to_pay = task.choice_to_pay
 
         # determine whether the lottery (option "A") or the sure payoff (option "B") was chosen
         # ------------------------------------------------------------------------------------------------------------
-        self.option_to_pay = getattr(self, self.choice_to_pay)
+        self.option_to_pay = self.get_option(task.index_to_pay)
 
         # set player's payoff
         # ------------------------------------------------------------------------------------------------------------
-        indices = [list(t) for t in zip(*self.participant.vars['cem_choices'])][0]
-        index_to_pay = indices.index(self.participant.vars['cem_index_to_pay']) + 1
-        choice_to_pay = self.participant.vars['cem_choices'][index_to_pay - 1]
-
-        if self.option_to_pay == 'A':
-            if self.random_draw <= choice_to_pay[2]:
-                self.payoff = Constants.endowment + choice_to_pay[3]
-            else:
-                self.payoff = Constants.endowment + choice_to_pay[4]
-        else:
-            self.payoff = Constants.endowment + choice_to_pay[5]
+        spec = self.get_spec()
+        choice_to_pay = spec.rows[task.index_to_pay - 1]
+        self.payoff = core.payoff(self.option_to_pay, choice_to_pay, self.random_draw, spec.endowment)
 
         # set payoff as global variable
         # ------------------------------------------------------------------------------------------------------------
-        self.participant.vars['cem_payoff'] = self.payoff
+        self.participant.cem_payoff = self.payoff
+
+        # add payoff to the admin report
+        # ------------------------------------------------------------------------------------------------------------
+        self.session.cem_report = core.report_payoffs(self.session.cem_report, [self.payoff])
+
+    # option chosen in the choice with index <index>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_option(self, index):
+        return core.option(self.get_task_player().choices_made, index)
 
     # determine consistency
     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
     def set_consistency(self):
 
-        n = Constants.num_choices
-
-        # replace A's by 1's and B's by 0's
-        self.participant.vars['cem_choices_made'] = [
-            1 if j == 'A' else 0 for j in self.participant.vars['cem_choices_made']
-        ]
-
-        # check for multiple switching behavior
-        for j in range(1, n):
-            choices = self.participant.vars['cem_choices_made']
-            self.inconsistent = 1 if choices[j] > choices[j - 1] else 0
-            if self.inconsistent == 1:
-                break
+        # choices are consistent if all "A" choices precede all "B" choices
+        self.inconsistent = 0 if core.is_consistent(self.get_task_player().choices_made) else 1
 
     # determine switching row
     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -179,4 +492,62 @@ class Player(BasePlayer):
 
         # set switching point to row number of first 'B' choice
         if self.inconsistent == 0:
-            self.switching_row = sum(self.participant.vars['cem_choices_made']) + 1
+            self.switching_row = core.switching_row(self.get_task_player().choices_made)
+
+            # look up certainty equivalent, risk premium, and indifference parameter implied by the switching row
+            results = core.certainty_equivalents(*self.get_spec().table)[self.switching_row - 1]
+            for field, value in results._asdict().items():
+                setattr(self, field, value)
+
+    # add switching row (or inconsistency) and completion time to the running aggregates of the admin report
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def add_to_report(self):
+        self.session.cem_report = core.report_result(
+            self.session.cem_report, self.switching_row, self.participant.cem_seconds
+        )
+
+
+# ******************************************************************************************************************** #
+# *** CUSTOM EXPORT
+# ******************************************************************************************************************** #
+
+# export one row per participant and decision (long format), joining the option chosen (<option>) with the parameters
+# of the choice and its position in the participant's display order (<position>); <to_pay> is 1 for the decision to pay
+# and the player's results (e.g. <switching_row>, <payoff>) are repeated in each of the player's rows
+# <payment_seed> is the seed of the session's payments, <order_seed> the seed of the participant's display order (empty
+# if <random_order = False>)
+# rows are generated one at a time, such that the memory footprint does not grow with the number of participants
+# --------------------------------------------------------------------------------------------------------------------
+def custom_export(players):
+
+    # header row
+    yield [
+        'session', 'participant', 'round_number', 'payment_seed', 'order_seed', 'index', 'position', 'probability',
+        'lottery_hi', 'lottery_lo', 'sure_payoff', 'option', 'to_pay', 'random_draw', 'option_to_pay', 'inconsistent',
+        'switching_row', 'ce_lower', 'ce_upper', 'ce_midpoint', 'risk_premium', 'indifference_lower',
+        'indifference_upper', 'indifference_midpoint', 'payoff'
+    ]
+
+    # one row per player and decision
+    for p in players:
+        spec = p.get_spec()
+        view = p.get_view()
+
+        # decisions of the player, i.e. only the decision of the current round if <one_choice_per_page = True>
+        indices = [view.indices[p.round_number - 1]] if Constants.one_choice_per_page else spec.indices
+        index_to_pay = p.get_task_player().index_to_pay
+
+        player = [
+            p.session.code, p.participant.code, p.round_number, p.session.cem_payment_seed, p.participant.cem_seed
+        ]
+        results = [
+            p.random_draw, p.option_to_pay, p.inconsistent, p.switching_row, p.ce_lower, p.ce_upper, p.ce_midpoint,
+            p.risk_premium, p.indifference_lower, p.indifference_upper, p.indifference_midpoint, p.payoff
+        ]
+
+        for k in indices:
+            probability, lottery_hi, lottery_lo, sure_payoff = (float(j) for j in spec.rows[k - 1][2:6])
+            yield player + [
+                k, view.position[k - 1], probability, lottery_hi, lottery_lo, sure_payoff,
+                p.get_choice(k), int(k == index_to_pay)
+            ] + results
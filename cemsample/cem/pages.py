@@ -1,176 +1,321 @@
 from otree.api import Currency as c, currency_range
-from . import models
+from . import models, benchmark, core
 from ._builtin import Page, WaitPage
 from .models import Constants
-from django.utils.translation import ugettext as _
+import time
+from gettext import gettext as _
+from functools import lru_cache
+from otree import settings
+from otree.templating import ibis_loader
 
 
-# variables for all templates
+# variables for all templates, i.e. the session's task specification, the lottery payoffs, and the probability, merged
+# into the variables <variables> of a page (oTree 5 does not call <vars_for_all_templates>)
 # --------------------------------------------------------------------------------------------------------------------
-def vars_for_all_templates(self):
-    return {
-        'lottery_lo':  c(Constants.lottery_lo),
-        'lottery_hi':  c(Constants.lottery_hi),
-        'probability': "{0:.1f}".format(Constants.probability) + "%"
-    }
+def template_vars(player, variables):
+    spec = player.get_spec()
+    return dict(spec.labels, spec=spec, **variables)
+
+
+# rendered rows of the list of choices (<DecisionRows.html>) for the parameterization <key> in language <language>
+# (see <Decision.get_language>)
+# if <random_order = False>, all participants of a session see the same rows in the same order, such that the rows are
+# rendered once and shared by all requests; display options (e.g. <accept_reject>) are part of <key>, and the least
+# recently used fragments are evicted once <maxsize> fragments are cached
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=128)
+def decision_rows(key, language):
+    spec = models.task_spec(key)
+    template = ibis_loader.load('cem/DecisionRows.html')
+    return template.render(dict(spec.labels, spec=spec, choices=spec.rows), strict_mode=True)
 
 
 # ******************************************************************************************************************** #
 # *** CLASS INSTRUCTIONS *** #
 # ******************************************************************************************************************** #
-class Instructions(Page):
+class Instructions(benchmark.TimedPage, Page):
 
-    # only display instruction in round 1
+    # only display instruction in round 1 (if <instructions = True>)
     # ----------------------------------------------------------------------------------------------------------------
     def is_displayed(self):
-        return self.subsession.round_number == 1
+        return self.player.get_spec().instructions and self.subsession.round_number == 1
 
+    # variables for template
+    # ----------------------------------------------------------------------------------------------------------------
     def vars_for_template(self):
-        return {
-            'lottery_lo': c(Constants.lottery_lo),
-            'lottery_hi': c(Constants.lottery_hi),
-            'probability': "{0:.1f}".format(Constants.probability) + "%"
-        }
+        return template_vars(self.player, {
+            'num_choices': len(self.player.get_spec().indices)
+        })
 
 # ******************************************************************************************************************** #
 # *** PAGE DECISION *** #
 # ******************************************************************************************************************** #
-class Decision(Page):
+class Decision(benchmark.TimedPage, Page):
 
     # form model
     # ----------------------------------------------------------------------------------------------------------------
     form_model = 'player'
 
+    # live method
+    # ----------------------------------------------------------------------------------------------------------------
+    if Constants.bisection:
+        live_method = 'live_bisection'
+
     # form fields
     # ----------------------------------------------------------------------------------------------------------------
     def get_form_fields(self):
 
-        # unzip list of form_fields from <cem_choices> list
-        form_fields = [list(t) for t in zip(*self.participant.vars['cem_choices'])][1]
+        # choices are submitted via live method if <bisection = True>
+        if Constants.bisection:
+            return []
+
+        # only the switching row is submitted if <submit_switching_row = True>
+        if Constants.submit_switching_row:
+            return ['switching_row']
+
+        # all choices are submitted in a single form field if <packed_choices = True>
+        if Constants.packed_choices:
+            return ['choices_packed']
+
+        # get (cached) list of form fields in display order
+        form_fields = self.player.get_view().form_fields
 
         # provide form field associated with pagination or full list
         if Constants.one_choice_per_page:
             page = self.subsession.round_number
             return [form_fields[page - 1]]
         else:
-            return form_fields
+            return list(form_fields)
+
+    # validate packed choices, i.e. one option "A" or "B" for each choice
+    # ----------------------------------------------------------------------------------------------------------------
+    def choices_packed_error_message(self, value):
+        if len(value) != len(self.player.get_spec().indices) or value.strip('AB'):
+            return _('Please make a decision for each choice.')
+
+    # validate switching row, i.e. a row from 1 (option "B" in all choices) to the number of choices plus 1 (option "A"
+    # in all choices)
+    # ----------------------------------------------------------------------------------------------------------------
+    def switching_row_error_message(self, value):
+        if not 1 <= value <= len(self.player.get_spec().indices) + 1:
+            return _('Please make a decision for each choice.')
+
+    # do not proceed before the switching row has been elicited if <bisection = True>
+    # ----------------------------------------------------------------------------------------------------------------
+    def error_message(self, values):
+        if Constants.bisection:
+            lo, hi = self.participant.cem_bisection
+            if lo < hi:
+                return _('Please make a decision for each choice.')
 
     # variables for template
     # ----------------------------------------------------------------------------------------------------------------
     def vars_for_template(self):
 
+        # record start of the task for the admin report
+        if self.participant.cem_started is None:
+            self.participant.cem_started = time.time()
+
         # specify info for progress bar
-        total = Constants.num_choices
+        total = len(self.player.get_spec().indices)
         page = self.subsession.round_number
         progress = page / total * 100
 
         if Constants.one_choice_per_page:
-            return {
+            return template_vars(self.player, {
                 'page':      page,
                 'total':     total,
                 'progress':  progress,
-                'choices':   [self.player.participant.vars['cem_choices'][page-1]]
-            }
+                'choices':   [self.player.get_choices()[page-1]],
+                'rows':      None
+            })
         else:
-            return {
-                'choices':   self.player.participant.vars['cem_choices']
-            }
+            return template_vars(self.player, {
+                'total':       total,
+                'progress':    progress,
+                'page_labels': self.get_page_labels(total),
+                'choices':     self.player.get_choices(),
+                'rows':        self.get_rows()
+            })
+
+    # labels of the pages if <paginated = True>, i.e. pairs of page number and "Page <page> of <total>"
+    # ----------------------------------------------------------------------------------------------------------------
+    def get_page_labels(self, total):
+        if not self.player.get_spec().paginated:
+            return []
+        label = _('Page %(page)s of %(total)s')
+        return [(page, label % {'page': page, 'total': total}) for page in range(1, total + 1)]
+
+    # (cached) rendered rows of the list of choices, if the list is displayed in the same order to all participants
+    # ----------------------------------------------------------------------------------------------------------------
+    def get_rows(self):
+        if not self.player.get_spec().random_order:
+            return decision_rows(models.spec_key(self.session.config), self.get_language())
+
+    # language of the session, i.e. <language> in the session config or, by default, the server's <LANGUAGE_CODE>;
+    # oTree translates templates into the language of the server process, such that fragments are cached per language
+    # ----------------------------------------------------------------------------------------------------------------
+    def get_language(self):
+        return self.session.config.get('language', settings.LANGUAGE_CODE)
 
     # set payoff, determine consistency, and set switching row
     # ----------------------------------------------------------------------------------------------------------------
+    @benchmark.timed('Decision.before_next_page')
     def before_next_page(self):
 
-        # unzip indices and form fields from <cem_choices> list
+        # get (cached) task specification, indices, and form fields in display order
         round_number = self.subsession.round_number
-        form_fields = [list(t) for t in zip(*self.participant.vars['cem_choices'])][1]
-        indices = [list(t) for t in zip(*self.participant.vars['cem_choices'])][0]
+        spec = self.player.get_spec()
+        view = self.player.get_view()
+        form_fields = view.form_fields
+        indices = view.indices
         index = indices[round_number - 1]
 
+        # record completion time for the admin report after final choice
+        if round_number == Constants.num_rounds and self.participant.cem_started is not None:
+            self.participant.cem_seconds = time.time() - self.participant.cem_started
+
         # if choices are displayed sequentially
         # ------------------------------------------------------------------------------------------------------------
         if Constants.one_choice_per_page:
 
-            # replace current choice in <choices_made>
+            # set or clear bit of current choice in <choices_made> (of the player of round 1)
+            task = self.player.get_task_player()
             current_choice = getattr(self.player, form_fields[round_number - 1])
-            self.participant.vars['cem_choices_made'][index - 1] = current_choice
-
-            # if current choice equals index to pay ...
-            if index == self.player.participant.vars['cem_index_to_pay']:
+            if current_choice == 'A':
+                task.choices_made |= 1 << (index - 1)
+            else:
+                task.choices_made &= ~(1 << (index - 1))
+
+            # if current choice equals index to pay (and payoffs are neither settled in a batch nor deferred) ...
+            settled_later = spec.batch_settlement or spec.deferred_settlement
+            if index == task.index_to_pay and not settled_later:
                 # set payoff
                 self.player.set_payoffs()
 
-            # after final choice
-            if round_number == Constants.num_choices:
+            # after final choice (unless settlement is deferred)
+            if round_number == Constants.num_rounds and not spec.deferred_settlement:
                 # determine consistency
                 self.player.set_consistency()
                 # set switching row
                 self.player.set_switching_row()
+                # add results to the admin report
+                self.player.add_to_report()
 
         # if choices are displayed in tabular format
         # ------------------------------------------------------------------------------------------------------------
         if not Constants.one_choice_per_page:
 
-            # replace choices in <choices_made>
-            for j, choice in zip(indices, form_fields):
-                choice_i = getattr(self.player, choice)
-                self.participant.vars['cem_choices_made'][j - 1] = choice_i
+            # pack choices into bitmask <choices_made>
+            # if <bisection = True>, <choices_made> has been set by the live method and implied choices are filled in
+            # if <submit_switching_row = True>, <choices_made> is implied by the submitted switching row
+            if Constants.bisection:
+                self.player.set_choices(self.player.choices_made)
+            elif Constants.submit_switching_row:
+                self.player.choices_made = core.switching_mask(self.player.switching_row)
+            elif Constants.packed_choices:
+                self.player.choices_made = core.unpack_choices(self.player.choices_packed)
+            else:
+                self.player.choices_made = core.choices_mask(
+                    indices, [getattr(self.player, choice) for choice in form_fields]
+                )
+
+            # settle choices (unless settlement is deferred)
+            if not spec.deferred_settlement:
+                # set payoff (unless payoffs are settled in a batch)
+                if not spec.batch_settlement:
+                    self.player.set_payoffs()
+                # determine consistency
+                self.player.set_consistency()
+                # set switching row
+                self.player.set_switching_row()
+                # add results to the admin report
+                self.player.add_to_report()
+
+
+# ******************************************************************************************************************** #
+# *** WAIT PAGE SETTLEMENT *** #
+# ******************************************************************************************************************** #
+class Settlement(benchmark.TimedPage, WaitPage):
+
+    # wait for all players in the session
+    # ----------------------------------------------------------------------------------------------------------------
+    wait_for_all_groups = True
+
+    # only display after the final decision (if <batch_settlement = True>)
+    # ----------------------------------------------------------------------------------------------------------------
+    def is_displayed(self):
+        return self.player.get_spec().batch_settlement and self.subsession.round_number == Constants.num_rounds
 
-            # set payoff
-            self.player.set_payoffs()
-            # determine consistency
-            self.player.set_consistency()
-            # set switching row
-            self.player.set_switching_row()
+    # settle payoffs of all players at once
+    # ----------------------------------------------------------------------------------------------------------------
+    def after_all_players_arrive(self):
+        self.subsession.set_payoffs()
 
 
 # ******************************************************************************************************************** #
 # *** PAGE RESULTS *** #
 # ******************************************************************************************************************** #
-class Results(Page):
+class Results(benchmark.TimedPage, Page):
 
-    # skip results until last page
+    # skip results until last page (and entirely if <results = False>)
     # ----------------------------------------------------------------------------------------------------------------
     def is_displayed(self):
+        if not self.player.get_spec().results:
+            return False
         if Constants.one_choice_per_page:
             return self.subsession.round_number == Constants.num_rounds
         return True
 
+    # settle choices via live method (if <deferred_settlement = True>)
+    # oTree looks up live methods per page class, i.e. for all sessions, such that <live_settlement> ignores messages
+    # in sessions without deferred settlement
+    # ----------------------------------------------------------------------------------------------------------------
+    live_method = 'live_settlement'
+
+    # settle choices on submitting the page if they have not been settled via the live method, i.e. if JavaScript is
+    # disabled (see <noscript> in Results.html)
+    # ----------------------------------------------------------------------------------------------------------------
+    def before_next_page(self):
+        if self.player.get_spec().deferred_settlement:
+            self.player.settle()
+
     # variables for template
     # ----------------------------------------------------------------------------------------------------------------
+    @benchmark.timed('Results.vars_for_template')
     def vars_for_template(self):
 
-        # unzip <cem_choices> into list of lists
-        choices = [list(t) for t in zip(*self.participant.vars['cem_choices'])]
-        indices = choices[0]
+        # results are displayed once the choices have been settled, i.e. the page reloads after the live method has
+        # settled deferred choices
+        task = self.player.get_task_player()
+        if not task.settled:
+            return template_vars(self.player, {'settled': False})
 
         # payoff information
-        index_to_pay = self.player.participant.vars['cem_index_to_pay']
-        round_to_pay = indices.index(index_to_pay) + 1
-        choice_to_pay = self.participant.vars['cem_choices'][round_to_pay - 1]
+        index_to_pay = task.index_to_pay
+        round_to_pay = self.player.get_view().position[index_to_pay - 1]
+        choice_to_pay = self.player.get_spec().rows[index_to_pay - 1]
 
         if Constants.one_choice_per_page:
-            return {
+            return template_vars(self.player, {
+                'settled':        True,
                 'choice_to_pay':  [choice_to_pay],
                 'option_to_pay':  self.player.in_round(round_to_pay).option_to_pay,
                 'accept_reject':  _("accept") if self.player.in_round(round_to_pay).option_to_pay == "A" else _("reject"),
                 'payoff':         self.player.in_round(round_to_pay).payoff,
-            }
+            })
         else:
-            return {
+            return template_vars(self.player, {
+                'settled':        True,
                 'choice_to_pay':  [choice_to_pay],
                 'option_to_pay':  self.player.option_to_pay,
                 'accept_reject':  _("accept") if self.player.option_to_pay == "A" else _("reject"),
                 'payoff':         self.player.payoff
-            }
+            })
 
 
 # ******************************************************************************************************************** #
 # *** PAGE SEQUENCE *** #
 # ******************************************************************************************************************** #
-page_sequence = [Decision]
-
-if Constants.instructions:
-    page_sequence.insert(0, Instructions)
-
-if Constants.results:
-    page_sequence.append(Results)
+# pages are skipped per session according to <instructions>, <batch_settlement>, and <results>
+page_sequence = [Instructions, Decision, Settlement, Results]
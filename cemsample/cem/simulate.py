@@ -0,0 +1,154 @@
+import argparse
+import csv
+import numpy as np
+from cem.config import Constants
+from cem import core
+
+
+# ******************************************************************************************************************** #
+# *** LIST OF CHOICES
+# ******************************************************************************************************************** #
+
+# indices, probabilities (in %), high and low lottery payoffs, and sure payoffs of the list of choices, built as in
+# <creating_session>
+# --------------------------------------------------------------------------------------------------------------------
+def build_list(variation=Constants.variation, num_choices=Constants.num_choices):
+
+    rows = core.build_table(
+        variation,
+        num_choices,
+        Constants.probability,
+        Constants.lottery_hi,
+        Constants.lottery_lo,
+        Constants.sure_payoff,
+        Constants.step_size
+    )
+    indices, _, probabilities, lottery_hi, lottery_lo, sure_payoffs = zip(*rows)
+
+    return (np.array(indices),) + tuple(
+        np.array(j, dtype=float) for j in [probabilities, lottery_hi, lottery_lo, sure_payoffs]
+    )
+
+
+# ******************************************************************************************************************** #
+# *** AGENTS
+# ******************************************************************************************************************** #
+
+# CRRA utility u(x) = x^(1 - r) / (1 - r), with u(x) = ln(x) for r = 1
+# --------------------------------------------------------------------------------------------------------------------
+def crra(x, r):
+    x = np.asarray(x, dtype=float)
+    r = np.asarray(r, dtype=float)
+    log = np.isclose(r, 1)
+    return np.where(log, np.log(x), x ** (1 - r) / np.where(log, 1, 1 - r))
+
+
+# simulate choices of CRRA expected utility agents over final payoffs (including <endowment>)
+# the agents' risk aversion coefficients are drawn from N(<r_mean>, <r_sd>); choices are subject to either
+# Fechner noise, i.e. "A" is chosen if (EU(A) - u(B)) / (u(max) - u(min)) + <noise> * N(0, 1) > 0 (contextual
+# utility), or trembling hand noise, i.e. each choice is picked at random with probability <noise>
+# returns the agents' coefficients and a boolean array (agents x choices) which is True for option "A"
+# --------------------------------------------------------------------------------------------------------------------
+def simulate_choices(num_agents, r_mean, r_sd, error='fechner', noise=0.1, rng=None,
+                     variation=Constants.variation, num_choices=Constants.num_choices):
+
+    rng = np.random.default_rng() if rng is None else rng
+    indices, probabilities, lottery_hi, lottery_lo, sure_payoffs = build_list(variation, num_choices)
+    r = rng.normal(r_mean, r_sd, size=(num_agents, 1))
+    p = probabilities / 100
+
+    # expected utility of the lottery (option "A") and utility of the sure payoff (option "B")
+    eu_a = p * crra(Constants.endowment + lottery_hi, r) + (1 - p) * crra(Constants.endowment + lottery_lo, r)
+    u_b = crra(Constants.endowment + sure_payoffs, r)
+
+    if error == 'fechner':
+        scale = np.abs(
+            crra(Constants.endowment + np.maximum(lottery_hi, sure_payoffs), r) -
+            crra(Constants.endowment + np.minimum(lottery_lo, sure_payoffs), r)
+        )
+        option_a = (eu_a - u_b) / scale + noise * rng.standard_normal(eu_a.shape) > 0
+    elif error == 'trembling_hand':
+        option_a = eu_a > u_b
+        tremble = rng.random(eu_a.shape) < noise
+        option_a = np.where(tremble, rng.random(eu_a.shape) < 0.5, option_a)
+    else:
+        raise ValueError("error must be 'fechner' or 'trembling_hand'")
+
+    return r[:, 0], option_a
+
+
+# ******************************************************************************************************************** #
+# *** TASK LOGIC
+# ******************************************************************************************************************** #
+
+# apply consistency, switching row, and payoff rules of the app to simulated choices
+# <option_a> is a boolean array (agents x choices) in the order of indices
+# --------------------------------------------------------------------------------------------------------------------
+def run_task(option_a, rng=None, variation=Constants.variation, num_choices=Constants.num_choices):
+
+    rng = np.random.default_rng() if rng is None else rng
+    indices, probabilities, lottery_hi, lottery_lo, sure_payoffs = build_list(variation, num_choices)
+    table = tuple(zip(indices, indices, probabilities, lottery_hi, lottery_lo, sure_payoffs))
+    num_agents = option_a.shape[0]
+
+    # bitmasks of choices made, consistency, and switching row
+    masks = core.batch_masks(option_a)
+    inconsistent = core.batch_inconsistent(masks)
+    switching_row = core.batch_switching_rows(masks)
+
+    # decisions to pay, random draws, and payoffs
+    index_to_pay, draws = core.batch_payments(num_agents, indices, rng)
+    chosen_a = core.batch_chosen_a(masks, index_to_pay)
+    payoff = core.batch_settle(index_to_pay, chosen_a, draws, table, Constants.endowment)
+
+    return {
+        'inconsistent':  inconsistent,
+        'switching_row': switching_row,
+        'random_draw':   draws,
+        'index_to_pay':  index_to_pay,
+        'choice_to_pay': np.char.add('choice_', index_to_pay.astype(str)),
+        'option_to_pay': np.where(chosen_a, 'A', 'B'),
+        'payoff':        payoff
+    }
+
+
+# synthetic dataset with one row per agent
+# --------------------------------------------------------------------------------------------------------------------
+def simulate(num_agents, r_mean, r_sd, error='fechner', noise=0.1, seed=None):
+
+    rng = np.random.default_rng(seed)
+    r, option_a = simulate_choices(num_agents, r_mean, r_sd, error, noise, rng)
+    results = run_task(option_a, rng)
+    indices = build_list()[0]
+
+    dataset = {'agent': np.arange(1, num_agents + 1), 'r': r}
+    dataset.update({'choice_' + str(k): np.where(option_a[:, j], 'A', 'B') for j, k in enumerate(indices)})
+    dataset.update(results)
+    return dataset
+
+
+# write dataset to csv
+# --------------------------------------------------------------------------------------------------------------------
+def to_csv(dataset, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(dataset.keys())
+        writer.writerows(zip(*(column.tolist() for column in dataset.values())))
+
+
+# ******************************************************************************************************************** #
+# *** MAIN
+# ******************************************************************************************************************** #
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Simulate CRRA agents answering the certainty equivalent list.')
+    parser.add_argument('num_agents', type=int)
+    parser.add_argument('--r-mean', type=float, default=0.3)
+    parser.add_argument('--r-sd', type=float, default=0.5)
+    parser.add_argument('--error', choices=['fechner', 'trembling_hand'], default='fechner')
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', default='cem_synthetic.csv')
+    args = parser.parse_args()
+
+    to_csv(simulate(args.num_agents, args.r_mean, args.r_sd, args.error, args.noise, args.seed), args.output)
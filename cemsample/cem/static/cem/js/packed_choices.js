@@ -0,0 +1,14 @@
+$(document).ready(function () {
+    $('form').submit(
+        function () {
+            var choices = [];
+
+            // collect options in the order of indices, i.e. "choice_1", "choice_2", ...
+            $('input[type=radio]:checked').each(function () {
+                choices[parseInt(this.name.replace('choice_', '')) - 1] = this.value;
+            });
+
+            $('#id_choices_packed').val(choices.join(''));
+        }
+    );
+});
\ No newline at end of file
@@ -0,0 +1,28 @@
+$(document).ready(function () {
+    var rows = $('tbody tr');
+    var labels = $('.page-label');
+    var current = 0;
+
+    // display the current choice only and update progress bar
+    function show(i) {
+        rows.hide();
+        rows.eq(i).show();
+        labels.hide();
+        labels.eq(i).show();
+
+        $('.progress-bar').css('width', (i + 1) / rows.length * 100 + '%');
+        $('.otree-btn-next').toggle(i === rows.length - 1);
+    }
+
+    // proceed to the next choice once the current choice has been made
+    $('input[type=radio]').change(
+        function () {
+            if (rows.index($(this).closest('tr')) === current && current < rows.length - 1) {
+                current += 1;
+                show(current);
+            }
+        }
+    );
+
+    show(current);
+});
\ No newline at end of file
@@ -0,0 +1,158 @@
+from cem import core
+
+
+# ******************************************************************************************************************** #
+# *** CHOICES
+# ******************************************************************************************************************** #
+
+# bitmasks of choices made (bit <k - 1> set for "A" in choice <k>) and their packed form in the order of indices
+# --------------------------------------------------------------------------------------------------------------------
+def test_choices_mask():
+    mask = core.choices_mask([1, 2, 3, 4], ['A', 'B', 'A', 'B'])
+    assert mask == 0b0101
+    assert [core.option(mask, k) for k in [1, 2, 3, 4]] == ['A', 'B', 'A', 'B']
+    assert core.pack_choices(mask, 4) == 'ABAB'
+    assert core.unpack_choices('ABAB') == mask
+
+
+# ******************************************************************************************************************** #
+# *** CONSISTENCY AND SWITCHING ROW
+# ******************************************************************************************************************** #
+
+# choices are consistent if all "A" choices precede all "B" choices; the switching row is the row of the first "B"
+# --------------------------------------------------------------------------------------------------------------------
+def test_switching_row():
+    assert core.is_consistent(0) and core.switching_row(0) == 1
+    assert core.is_consistent(0b0111) and core.switching_row(0b0111) == 4
+    assert not core.is_consistent(0b101) and core.switching_row(0b101) is None
+
+
+# ******************************************************************************************************************** #
+# *** BISECTION
+# ******************************************************************************************************************** #
+
+# answering the choices asked for as implied by a switching row elicits that switching row
+# --------------------------------------------------------------------------------------------------------------------
+def test_bisection():
+    for row in range(1, 27):
+        mask = core.switching_mask(row)
+        lo, hi = core.bisection_start(25)
+        while core.bisection_index(lo, hi) is not None:
+            index = core.bisection_index(lo, hi)
+            lo, hi = core.bisection_step(lo, hi, index, core.option(mask, index))
+        assert lo == hi == row == core.switching_row(mask)
+
+
+# ******************************************************************************************************************** #
+# *** CERTAINTY EQUIVALENTS
+# ******************************************************************************************************************** #
+
+# list of four choices with a lottery paying 40 or 10 with a probability of 50% (expected value 25) and a sure payoff of
+# 25 in the first choice; results are given for switching rows 1 (sure payoff in all choices), 3, and 5 (lottery in
+# all choices) as (lower, upper, midpoint) of the indifference interval and the risk premium
+# --------------------------------------------------------------------------------------------------------------------
+def results(variation, step_size):
+    equivalents = core.certainty_equivalents(variation, 4, 50, 40, 10, 25, step_size)
+    return [
+        (e.indifference_lower, e.indifference_upper, e.indifference_midpoint, e.risk_premium)
+        for e in (equivalents[0], equivalents[2], equivalents[4])
+    ]
+
+
+# increasing sure payoff: the certainty equivalent lies between the sure payoffs of the last "A" and the first "B"
+# choice
+# --------------------------------------------------------------------------------------------------------------------
+def test_sure_payoff_increasing():
+    assert results('sure_payoff', 1) == [(None, 25, None, None), (26, 27, 26.5, -1.5), (28, None, None, None)]
+    assert core.certainty_equivalents('sure_payoff', 4, 50, 40, 10, 25, 1)[2][:3] == (26, 27, 26.5)
+
+
+# decreasing sure payoff: "B" in all choices only bounds the certainty equivalent from above (by the first sure
+# payoff), and the limits of bounded intervals are the smaller and the larger of the bracketing sure payoffs
+# --------------------------------------------------------------------------------------------------------------------
+def test_sure_payoff_decreasing():
+    assert results('sure_payoff', -1) == [(None, 25, None, None), (23, 24, 23.5, 1.5), (22, None, None, None)]
+    assert core.certainty_equivalents('sure_payoff', 4, 50, 40, 10, 25, -1)[0][:3] == (None, 25, None)
+
+
+# list of choices set in config.py (sure payoff decreasing from 25 by 1, lottery paying 25 with a probability of 10%):
+# every switching row within the list yields a certainty equivalent and a risk premium
+# --------------------------------------------------------------------------------------------------------------------
+def test_sure_payoff_config():
+    equivalents = core.certainty_equivalents('sure_payoff', 25, 10, 25, 0, 25, -1)
+    assert equivalents[12][:4] == (13, 14, 13.5, 2.5 - 13.5)
+    assert all(e.ce_lower < e.ce_upper and e.risk_premium is not None for e in equivalents[1:-1])
+
+
+# decreasing low lottery payoff (positive step size): the indifference value lies between the low payoffs of the first
+# "B" and the last "A" choice, and the sure payoff is the certainty equivalent of the lottery with the midpoint
+# --------------------------------------------------------------------------------------------------------------------
+def test_lottery_lo_decreasing():
+    assert results('lottery_lo', 2) == [(10, None, None, None), (6, 8, 7.0, -1.5), (None, 4, None, None)]
+    assert core.certainty_equivalents('lottery_lo', 4, 50, 40, 10, 25, 2)[2][:3] == (25, 25, 25)
+
+
+# increasing low lottery payoff (negative step size): the limits are the smaller and the larger of the bracketing low
+# payoffs
+# --------------------------------------------------------------------------------------------------------------------
+def test_lottery_lo_increasing():
+    assert results('lottery_lo', -2) == [(10, None, None, None), (12, 14, 13.0, 1.5), (None, 16, None, None)]
+
+
+# decreasing probability: the indifference probability lies between the probabilities of the first "B" and the last
+# "A" choice
+# --------------------------------------------------------------------------------------------------------------------
+def test_probability_decreasing():
+    assert results('probability', -10) == [(50, None, None, None), (30, 40, 35.0, -4.5), (None, 20, None, None)]
+
+
+# ******************************************************************************************************************** #
+# *** SETTLEMENT
+# ******************************************************************************************************************** #
+
+# the "high" outcome of the decision to pay is paid with its probability (in %); rates are estimated from draws of a
+# fixed seed
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_payments_probability():
+    table = core.build_table('probability', 10, 5, 40, 10, 25, 10)
+    index_to_pay, draws = core.batch_payments(200000, [row[0] for row in table], seed=1)
+    assert set(draws.tolist()) == set(range(1, 101))
+    for row in table:
+        drawn = draws[index_to_pay == row[0]]
+        high = [core.payoff('A', row, d, 0) == row[3] for d in drawn.tolist()]
+        assert abs(sum(high) / len(high) - row[2] / 100) < 0.01
+
+
+# ******************************************************************************************************************** #
+# *** BATCH FUNCTIONS
+# ******************************************************************************************************************** #
+
+# batch functions agree with their scalar counterparts for all bitmasks of four choices (-1 for inconsistent choices)
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_switching_rows():
+    masks = list(range(16))
+    option_a = [[core.option(mask, k) == 'A' for k in [1, 2, 3, 4]] for mask in masks]
+    assert core.batch_masks(option_a).tolist() == masks
+    assert core.batch_switching_rows(masks).tolist() == [
+        core.switching_row(m) if core.is_consistent(m) else -1 for m in masks
+    ]
+
+
+# payments drawn from the same seed are identical, i.e. the payments of a session can be reproduced from its seed
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_payments_seed():
+    index_to_pay, draws = core.batch_payments(1000, range(1, 26), seed=42)
+    index_to_pay_2, draws_2 = core.batch_payments(1000, range(1, 26), seed=42)
+    assert (index_to_pay == index_to_pay_2).all() and (draws == draws_2).all()
+
+
+# payoffs of a batch of players agree with <payoff>
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_settle():
+    table = core.build_table('sure_payoff', 25, 10, 25, 0, 25, -1)
+    index_to_pay, draws = core.batch_payments(1000, [row[0] for row in table], seed=1)
+    option_a = core.batch_chosen_a([0b0111] * 1000, index_to_pay)
+    payoffs = core.batch_settle(index_to_pay, option_a, draws, table, 5)
+    assert payoffs.tolist() == [
+        core.payoff(core.option(0b0111, k), table[k - 1], d, 5) for k, d in zip(index_to_pay.tolist(), draws.tolist())
+    ]
@@ -1,10 +1,18 @@
-from otree.api import Currency as c, currency_range
+from otree.api import Currency as c, currency_range, expect
 from . import pages
 from ._builtin import Bot
 from .models import Constants
 import random
 
 
+# if <deferred_settlement = True>, bots with an odd <id_in_group> request settlement via the live method of the page
+# "Results" (as settlement.js does), while the others submit the page without it (as with JavaScript disabled), such
+# that their choices are settled by the server-side fallback on submitting the page
+# --------------------------------------------------------------------------------------------------------------------
+def settles_live(player):
+    return player.id_in_group % 2 == 1
+
+
 # **********************************************************************************************************************
 # *** BOT
 # **********************************************************************************************************************
@@ -16,12 +24,15 @@ class PlayerBot(Bot):
         page = self.subsession.round_number
 
         # get bot's switching point
-        switching_point = self.player.participant.vars['cem-bot_switching_point']
+        switching_point = self.player.participant.cem_switching_point
+
+        # get session's task specification
+        spec = self.player.get_spec()
 
         # ------------------------------------------------------------------------------------------------------------ #
         # submit instructions page
         # ------------------------------------------------------------------------------------------------------------ #
-        if Constants.instructions:
+        if spec.instructions:
             if Constants.one_choice_per_page:
                 if page == 1:
                     yield (pages.Instructions)
@@ -31,8 +42,9 @@ class PlayerBot(Bot):
         # ------------------------------------------------------------------------------------------------------------ #
         # make decisions
         # ------------------------------------------------------------------------------------------------------------ #
-        indices = [list(t) for t in zip(*self.player.participant.vars['cem_choices'])][0]
-        form_fields = [list(t) for t in zip(*self.player.participant.vars['cem_choices'])][1]
+        view = self.player.get_view()
+        indices = view.indices
+        form_fields = view.form_fields
 
         if Constants.one_choice_per_page:
             if indices[page - 1] <= switching_point:
@@ -44,6 +56,21 @@ class PlayerBot(Bot):
                     form_fields[page - 1]: 'B'
             })
 
+        elif Constants.bisection:
+            # choices are answered via the live method (see <call_live_method>)
+            yield (pages.Decision)
+
+        elif Constants.submit_switching_row:
+            yield (pages.Decision, {
+                'switching_row': min(switching_point + 1, len(indices) + 1)
+            })
+
+        elif Constants.packed_choices:
+            decisions = ''.join('A' if i <= switching_point else 'B' for i in sorted(indices))
+            yield (pages.Decision, {
+                'choices_packed': decisions
+            })
+
         else:
             decisions = []
             for i in indices:
@@ -60,9 +87,40 @@ class PlayerBot(Bot):
         # ------------------------------------------------------------------------------------------------------------ #
         # submit results page
         # ------------------------------------------------------------------------------------------------------------ #
-        if Constants.results:
+        if spec.results:
             if Constants.one_choice_per_page:
-                if page == Constants.num_choices:
+                if page == Constants.num_rounds:
                     yield (pages.Results)
             else:
-                yield (pages.Results)
\ No newline at end of file
+                yield (pages.Results)
+
+            # choices are settled once the results page has been submitted, with or without the live method
+            if page == Constants.num_rounds:
+                expect(self.player.get_task_player().settled, True)
+
+
+# **********************************************************************************************************************
+# *** LIVE METHOD
+# **********************************************************************************************************************
+def call_live_method(method, **kwargs):
+
+    # request settlement of deferred choices on the results page (if <deferred_settlement = True>) for the players in
+    # the group that settle via the live method (see <settles_live>)
+    if kwargs.get('page_class') == pages.Results:
+        for player in kwargs['group'].get_players():
+            if player.get_spec().deferred_settlement and settles_live(player):
+                method(player.id_in_group, {})
+        return
+
+    # answer choices requested by bisection for all players in the group according to their switching points
+    # (the live method is called once per group, i.e. before the other bots in the group have reached the page)
+    for player in kwargs['group'].get_players():
+        id_in_group = player.id_in_group
+        switching_point = player.participant.cem_switching_point
+        response = method(id_in_group, {})
+        while 'index' in response[id_in_group]:
+            index = response[id_in_group]['index']
+            response = method(id_in_group, {
+                'index': index,
+                'answer': 'A' if index <= switching_point else 'B'
+            })
\ No newline at end of file
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from scipy import sparse
+from scipy.optimize import least_squares
+from cem.config import Constants
+from cem.estimate import log_certainty_equivalent
+
+
+# ******************************************************************************************************************** #
+# *** PROBABILITY WEIGHTING
+# ******************************************************************************************************************** #
+
+# parameters of the probability weighting functions (in addition to the CRRA coefficient r)
+# --------------------------------------------------------------------------------------------------------------------
+PARAMETERS = {'prelec': ('gamma', 'delta'), 'tk': ('gamma',)}
+
+
+# decision weight of the "high" outcome with probability <p>
+# 'prelec': w(p) = exp(-delta * (-ln p)^gamma) (Prelec, 1998)
+# 'tk':     w(p) = p^gamma / (p^gamma + (1 - p)^gamma)^(1/gamma) (Tversky/Kahneman, 1992)
+# --------------------------------------------------------------------------------------------------------------------
+def weight(function, p, gamma, delta=1):
+
+    if function == 'prelec':
+        return np.exp(-delta * (-np.log(p)) ** gamma)
+
+    if function == 'tk':
+        return p ** gamma / (p ** gamma + (1 - p) ** gamma) ** (1 / gamma)
+
+    raise ValueError("function must be 'prelec' or 'tk'")
+
+
+# log certainty equivalent of lotteries paying <lottery_hi> with probability <p> and <lottery_lo> otherwise under
+# rank-dependent utility with CRRA utility (coefficient r) and probability weighting function <function>
+# parameters are broadcast against the lists, i.e. for subject-specific parameters they have shape (subjects x 1)
+# --------------------------------------------------------------------------------------------------------------------
+def log_certainty_equivalents(function, r, weights, p, lottery_hi, lottery_lo):
+    w = weight(function, p, *weights)
+    lottery = (np.stack([lottery_hi, lottery_lo], axis=-1), np.stack([w, 1 - w], axis=-1))
+    return log_certainty_equivalent(lottery, r)[0]
+
+
+# ******************************************************************************************************************** #
+# *** ESTIMATION
+# ******************************************************************************************************************** #
+
+# least squares estimates of the CRRA coefficient r and the parameters of the probability weighting function <function>
+# from certainty equivalents <ce> of lotteries (<p>, <lottery_hi>, <lottery_lo>), given as arrays (subjects x lists)
+# with probabilities in [0, 1], payoffs including <endowment>, and nan for missing lists (see <load_equivalents>)
+# residuals are the differences in log certainty equivalents, evaluated for all subjects and lists at once; as the
+# residuals of a subject only depend on its own parameters, all subjects are fitted simultaneously by a single
+# optimization over the stacked parameters with a block-diagonal Jacobian; if <processes> is set, subjects are split
+# into <processes> chunks which are fitted in parallel
+# as the optimizer's status (<converged>) refers to the joint optimization of all subjects of a chunk, each subject's
+# fit is diagnosed by the largest absolute gradient of its sum of squares with respect to its parameters not at a
+# bound (<gradient>, close to zero at a minimum) and by the number of its parameters at a bound (<at_bound>)
+# --------------------------------------------------------------------------------------------------------------------
+def fit(p, lottery_hi, lottery_lo, ce, function='prelec', r_bounds=(-5, 5), weight_bounds=(0.05, 5), processes=None):
+
+    p, lottery_hi, lottery_lo, ce = (np.atleast_2d(np.asarray(j, dtype=float)) for j in [p, lottery_hi, lottery_lo, ce])
+    subjects, lists = ce.shape
+    if function not in PARAMETERS:
+        raise ValueError("function must be 'prelec' or 'tk'")
+    names = PARAMETERS[function]
+
+    # fit chunks of subjects in parallel
+    if processes and processes > 1 and subjects > 1:
+        chunks = np.array_split(np.arange(subjects), min(processes, subjects))
+        job = partial(fit, function=function, r_bounds=r_bounds, weight_bounds=weight_bounds)
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(job, *([j[chunk] for chunk in chunks] for j in [p, lottery_hi, lottery_lo, ce])))
+        return {k: np.concatenate([j[k] for j in results]) for k in results[0]}
+
+    # lists with a missing certainty equivalent or a degenerate lottery are not observed (and set to a valid lottery)
+    observed = ~np.isnan(ce) & ~np.isnan(p) & (p > 0) & (p < 1)
+    p = np.where(observed, p, 0.5)
+    lottery_hi, lottery_lo = np.where(observed, lottery_hi, 2), np.where(observed, lottery_lo, 1)
+    log_ce = np.where(observed, np.log(np.where(observed, ce, 1)), 0)
+
+    def residuals(theta):
+        r, *weights = theta.reshape(1 + len(names), subjects, 1)
+        predicted = log_certainty_equivalents(function, r, weights, p, lottery_hi, lottery_lo)
+        return np.where(observed, predicted - log_ce, 0).ravel()
+
+    # residuals of subject <i> (rows i * lists, ..., (i + 1) * lists - 1) depend on its parameters only
+    block = sparse.kron(sparse.identity(subjects), np.ones((lists, 1)))
+    sparsity = sparse.hstack([block] * (1 + len(names)))
+
+    start = np.concatenate([np.full(subjects, 0.3)] + [np.ones(subjects)] * len(names))
+    lower = np.concatenate([np.full(subjects, r_bounds[0])] + [np.full(subjects, weight_bounds[0])] * len(names))
+    upper = np.concatenate([np.full(subjects, r_bounds[1])] + [np.full(subjects, weight_bounds[1])] * len(names))
+    result = least_squares(residuals, start, bounds=(lower, upper), jac_sparsity=sparsity, method='trf')
+
+    estimates = result.x.reshape(1 + len(names), subjects)
+    num_lists = observed.sum(axis=-1)
+    squares = (result.fun.reshape(subjects, lists) ** 2).sum(axis=-1)
+
+    # gradient of the sum of squares (J'f) per parameter, and parameters at a bound
+    gradient = (result.jac.T @ result.fun).reshape(1 + len(names), subjects)
+    at_bound = (np.isclose(result.x, lower) | np.isclose(result.x, upper)).reshape(1 + len(names), subjects)
+
+    return {
+        'r':         estimates[0],
+        **dict(zip(names, estimates[1:])),
+        'rmse':      np.sqrt(squares / np.maximum(num_lists, 1)),
+        'num_lists': num_lists,
+        'converged': np.full(subjects, result.status > 0),
+        'gradient':  np.abs(np.where(at_bound, 0, gradient)).max(axis=0),
+        'at_bound':  at_bound.sum(axis=0)
+    }
+
+
+# ******************************************************************************************************************** #
+# *** DATA
+# ******************************************************************************************************************** #
+
+# read certainty equivalents from custom exports of the app (one row per participant and decision), with one list per
+# participant (column <subject>, e.g. 'participant' or a column identifying subjects across sessions) and session
+# the results of a list are its lottery with the parameter given by <variation> set to the midpoint of the
+# indifference interval, and the sure payoff as its certainty equivalent; lists with an unbounded interval (i.e.
+# switching rows 1 and <num_choices> + 1) or inconsistent choices are skipped
+# returns the subjects and arrays (subjects x lists, padded with nan) of probabilities (in [0, 1]), high and low
+# lottery payoffs, and certainty equivalents, with payoffs including <endowment>
+# --------------------------------------------------------------------------------------------------------------------
+def load_equivalents(paths, variation=Constants.variation, endowment=Constants.endowment, subject='participant'):
+
+    lists, subjects = set(), {}
+    for path in paths:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                key = (row[subject], row['session'])
+                if key in lists or not row['indifference_midpoint']:
+                    continue
+                lists.add(key)
+
+                lottery = {k: float(row[k]) for k in ['probability', 'lottery_hi', 'lottery_lo', 'sure_payoff']}
+                lottery[variation] = float(row['indifference_midpoint'])
+                subjects.setdefault(row[subject], []).append([
+                    lottery['probability'] / 100,
+                    endowment + lottery['lottery_hi'],
+                    endowment + lottery['lottery_lo'],
+                    endowment + lottery['sure_payoff']
+                ])
+
+    data = np.full((len(subjects), max(map(len, subjects.values()), default=0), 4), np.nan)
+    for i, equivalents in enumerate(subjects.values()):
+        data[i, :len(equivalents)] = equivalents
+
+    return list(subjects), data[..., 0], data[..., 1], data[..., 2], data[..., 3]
+
+
+# ******************************************************************************************************************** #
+# *** MAIN
+# ******************************************************************************************************************** #
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Estimate utility curvature and probability weighting from the '
+                                                 'certainty equivalents in session exports.')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--function', choices=list(PARAMETERS), default='prelec')
+    parser.add_argument('--variation', choices=['sure_payoff', 'probability', 'lottery_hi', 'lottery_lo'],
+                        default=Constants.variation)
+    parser.add_argument('--subject', default='participant')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--output', default='cem_weighting.csv')
+    args = parser.parse_args()
+
+    subjects, *data = load_equivalents(args.paths, args.variation, subject=args.subject)
+    estimates = fit(*data, function=args.function, processes=args.processes)
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['subject'] + list(estimates))
+        writer.writerows(zip(subjects, *(column.tolist() for column in estimates.values())))
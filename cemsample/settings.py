@@ -6,6 +6,16 @@ SESSION_CONFIGS = [
         app_sequence=['cem'],
         num_demo_participants=3,
     ),
+
+    # parameters in cem/config.py can be overridden per session, e.g.
+    # dict(
+    #     name='cem_probability',
+    #     app_sequence=['cem'],
+    #     num_demo_participants=3,
+    #     variation='probability',
+    #     step_size=4,
+    #     num_choices=20,
+    # ),
 ]
 
 # if you set a property in SESSION_CONFIG_DEFAULTS, it will be inherited by all configs
@@ -17,8 +27,21 @@ SESSION_CONFIG_DEFAULTS = dict(
     real_world_currency_per_point=1.00, participation_fee=0.00, doc=""
 )
 
-PARTICIPANT_FIELDS = []
-SESSION_FIELDS = []
+# state of the cem app kept per participant across rounds and pages
+# (oTree stores these fields in the participant's pickled <vars> column, i.e. declaring them does not add database
+# columns, but gives validated attribute access and export columns; the task state read and updated on (almost)
+# every request, i.e. the decision to pay, the random draw, the choices made, and whether choices have been settled,
+# is stored in typed columns of the player instead, see <Player.get_task_player> in cem/models.py)
+PARTICIPANT_FIELDS = [
+    'cem_seed',
+    'cem_bisection',
+    'cem_payoff',
+    'cem_started',
+    'cem_seconds',
+    'cem_switching_point',
+]
+# seed of all payment randomness and running aggregates of the admin report of a session
+SESSION_FIELDS = ['cem_payment_seed', 'cem_report']
 
 # ISO-639 code
 # for example: de, fr, ja, ko, zh-hans
@@ -1,101 +1,158 @@
-# <imports>
-from otree.api import Currency as c
-from otree.constants import BaseConstants
-# </imports>
-
-
-# ******************************************************************************************************************** #
-# *** CLASS CONSTANTS *** #
-# ******************************************************************************************************************** #
-class Constants(BaseConstants):
-
-    # ---------------------------------------------------------------------------------------------------------------- #
-    # --- Task-specific Settings --- #
-    # ---------------------------------------------------------------------------------------------------------------- #
-
-    # lottery payoffs
-    # "high" and "low" outcomes (in currency units set in settings.py) of "lottery A" and "lottery B"
-    # note that payoffs are identical for all choices and only probabilities of "high" and "low" outcomes change
-    lottery_a_hi = 2.00
-    lottery_a_lo = 1.60
-    lottery_b_hi = 3.85
-    lottery_b_lo = 0.10
-
-    # number of binary choices between "lottery A" and "lottery B"
-    # note that the number of choices determines the probabilities of high and low outcomes of lotteries "A" and "B"
-    # for <num_choices = X>, the probability of outcome "high" is 1/X for the first choice, 2/X for the second, etc.
-    num_choices = 10
-
-    # include 'certain' choice (** only applies if <variation_type = 'probability'> **)
-    # if <certain_choice = True>, the binary choice with probability of the outcome "high" being equal to 1 is included
-    # if <certain_choice = False>, the list only contains (<num_choices> - 1) binary decision pairs
-    # note, however, that the probability of outcome "high" is set by <num_choices>, not (<num_choices> - 1), though
-    # i.e., if <certain_choice = False>, the last choice implies a probability of (X - 1)/X (given <num_choices = X>)
-    certain_choice = True
-
-    # ---------------------------------------------------------------------------------------------------------------- #
-    # --- Overall Settings and Appearance --- #
-    # ---------------------------------------------------------------------------------------------------------------- #
-
-    # show each lottery pair on a separate page
-    # if <one_choice_per_page = True>, each single binary choice between lottery "A" and "B" is shown on a separate page
-    # if <one_choice_per_page = False>, all <num_choices> choices are displayed in a table on one page
-    one_choice_per_page = False
-
-    # order choices between lottery pairs randomly
-    # if <random_order = True>, the ordering of binary decisions is randomized for display
-    # if <random_order = False>, binary choices are listed in ascending order of the probability of the "high" outcome
-    random_order = False
-
-    # enforce consistency, i.e. only allow for a single switching point
-    # if <enforce_consistency = True>, all options "A" above a selected option "A" are automatically selected
-    # similarly, all options "B" below a selected option "B" are automatically checked, implying consistent choices
-    # note that <enforce_consistency> is only implemented if <one_choice_per_page = False> and <random_order = False>
-    enforce_consistency = False
-
-    # depict probabilities as percentage numbers
-    # if <percentage = True>, the probability of outcome "high" will be displayed as percentage number
-    # if <percentage = False>, the probabilities will be displayed as fractions, i.e. "1/X", "2/X", etc.
-    percentage = False
-
-    # show small pie charts for each lottery
-    # if <small_pies = True>, a pie chart depicting the probabilities of outcomes is rendered next to each lottery
-    # if <small_pies = False>, no graphical representation of probabilities is displayed
-    small_pies = True
-
-    # display lotteries in terms of large pie charts
-    # if <large_pies = True>, lotteries are depicted as pie charts; if <large_pies = False> lotteries are list items
-    # note that <large_pies = True> only affects the task's appearance if <one_choice_per_page = True>
-    large_pies = True
-
-    # show progress bar
-    # if <progress_bar = True> and <one_choice_per_page = True>, a progress bar is rendered
-    # if <progress_bar = False>, no information with respect to the advance within the task is displayed
-    # the progress bar graphically depicts the advance within the task in terms of how many decision have been made
-    # further, information in terms of "page x out of <num_choices>" (with x denoting the current choice) is provided
-    progress_bar = True
-
-    # show instructions page
-    # if <instructions = True>, a separate template "Instructions.html" is rendered prior to the task
-    # if <instructions = False>, the task starts immediately (e.g. in case of printed instructions)
-    instructions = True
-
-    # show results page summarizing the task's outcome including payoff information
-    # if <results = True>, a separate page containing all relevant information is displayed after finishing the task
-    # if <results = False>, the template "Decision.html" will not be rendered
-    results = True
-
-    # ---------------------------------------------------------------------------------------------------------------- #
-    # --- oTree Settings (Don't Modify) --- #
-    # ---------------------------------------------------------------------------------------------------------------- #
-
-    name_in_url = 'mpl'
-    players_per_group = None
-
-    if one_choice_per_page:
-        if certain_choice:
-            num_rounds = num_choices
-        else:
-            num_rounds = num_choices - 1
-    else:
-        num_rounds = 1
+# ******************************************************************************************************************** #
+# *** CLASS CONSTANTS *** #
+# ******************************************************************************************************************** #
+# config.py does not import oTree, such that offline tools (e.g. <simulate.py>, <estimate.py>) can read the parameters
+# without an oTree installation; models.py derives oTree's (read-only) <Constants> from this class
+class Constants:
+
+    # note that the parameters below can be overridden per session by adding them to the respective entry of
+    # SESSION_CONFIGS in settings.py (e.g. <percentage=True>), except for <one_choice_per_page>, <bisection>,
+    # <packed_choices>, <submit_switching_row>, and <max_num_choices>, which determine the rounds, pages, and model
+    # fields of the app
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # --- Task-specific Settings --- #
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    # lottery payoffs
+    # "high" and "low" outcomes (in currency units set in settings.py) of "lottery A" and "lottery B"
+    # note that payoffs are identical for all choices and only probabilities of "high" and "low" outcomes change
+    lottery_a_hi = 2.00
+    lottery_a_lo = 1.60
+    lottery_b_hi = 3.85
+    lottery_b_lo = 0.10
+
+    # number of binary choices between "lottery A" and "lottery B"
+    # note that the number of choices determines the probabilities of high and low outcomes of lotteries "A" and "B"
+    # for <num_choices = X>, the probability of outcome "high" is 1/X for the first choice, 2/X for the second, etc.
+    # the list holds at most 31 choices
+    num_choices = 10
+
+    # include 'certain' choice (** only applies if <variation_type = 'probability'> **)
+    # if <certain_choice = True>, the binary choice with probability of the outcome "high" being equal to 1 is included
+    # if <certain_choice = False>, the list only contains (<num_choices> - 1) binary decision pairs
+    # note, however, that the probability of outcome "high" is set by <num_choices>, not (<num_choices> - 1), though
+    # i.e., if <certain_choice = False>, the last choice implies a probability of (X - 1)/X (given <num_choices = X>)
+    certain_choice = True
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # --- Overall Settings and Appearance --- #
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    # show each lottery pair on a separate page
+    # if <one_choice_per_page = True>, each single binary choice between lottery "A" and "B" is shown on a separate page
+    # if <one_choice_per_page = False>, all <num_choices> choices are displayed in a table on one page
+    one_choice_per_page = False
+
+    # show each lottery pair on a separate screen within a single page
+    # if <paginated = True>, the choices are shown one at a time (similar to <one_choice_per_page = True>), but all
+    # choices are part of a single page and round; the next choice is displayed without reloading the page
+    # if <paginated = False>, the display of choices is determined by <one_choice_per_page>
+    # note that <paginated> is only implemented if <one_choice_per_page = False>
+    paginated = False
+
+    # elicit switching row by bisection
+    # if <bisection = True>, the choices are shown one at a time, with each choice being picked such that it halves the
+    # range of possible switching rows, i.e. about log2(<num_choices>) choices are made rather than <num_choices>
+    # the choices implied by the elicited switching row are filled in for all remaining choices (and are used for
+    # determining the payoff), such that choices are consistent by construction
+    # if <bisection = False>, all <num_choices> choices are displayed
+    # note that <bisection> is only implemented if <one_choice_per_page = False>
+    bisection = False
+
+    # order choices between lottery pairs randomly
+    # if <random_order = True>, the ordering of binary decisions is randomized for display
+    # if <random_order = False>, binary choices are listed in ascending order of the probability of the "high" outcome
+    random_order = False
+
+    # enforce consistency, i.e. only allow for a single switching point
+    # if <enforce_consistency = True>, all options "A" above a selected option "A" are automatically selected
+    # similarly, all options "B" below a selected option "B" are automatically checked, implying consistent choices
+    # note that <enforce_consistency> is only implemented if <one_choice_per_page = False> and <random_order = False>
+    enforce_consistency = False
+
+    # depict probabilities as percentage numbers
+    # if <percentage = True>, the probability of outcome "high" will be displayed as percentage number
+    # if <percentage = False>, the probabilities will be displayed as fractions, i.e. "1/X", "2/X", etc.
+    percentage = False
+
+    # show small pie charts for each lottery
+    # if <small_pies = True>, a pie chart depicting the probabilities of outcomes is rendered next to each lottery
+    # if <small_pies = False>, no graphical representation of probabilities is displayed
+    small_pies = True
+
+    # display lotteries in terms of large pie charts
+    # if <large_pies = True>, lotteries are depicted as pie charts; if <large_pies = False> lotteries are list items
+    # note that <large_pies = True> only affects the task's appearance if <one_choice_per_page = True>
+    large_pies = True
+
+    # show progress bar
+    # if <progress_bar = True> and <one_choice_per_page = True> or <paginated = True>, a progress bar is rendered
+    # if <progress_bar = False>, no information with respect to the advance within the task is displayed
+    # the progress bar graphically depicts the advance within the task in terms of how many decision have been made
+    # further, information in terms of "page x out of <num_choices>" (with x denoting the current choice) is provided
+    progress_bar = True
+
+    # show instructions page
+    # if <instructions = True>, a separate template "Instructions.html" is rendered prior to the task
+    # if <instructions = False>, the task starts immediately (e.g. in case of printed instructions)
+    instructions = True
+
+    # show results page summarizing the task's outcome including payoff information
+    # if <results = True>, a separate page containing all relevant information is displayed after finishing the task
+    # if <results = False>, the template "Decision.html" will not be rendered
+    results = True
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # --- Data Storage and Settlement --- #
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    # settle payoffs of all participants in a single batch
+    # if <batch_settlement = True>, payoffs are not determined on each participant's final submit but for all
+    # participants in the session at once on a wait page that is displayed after all decisions have been made
+    # if <batch_settlement = False>, each participant's payoff is determined when submitting her final decision
+    batch_settlement = False
+
+    # settle choices after the final decision has been submitted
+    # if <deferred_settlement = True>, submitting the final decision only stores the choices; consistency, switching
+    # row, and payoff are determined off the request path by the page "Results" (via its live method, with the results
+    # being displayed once settled) or, if <batch_settlement = True>, on the wait page settling all participants
+    # if <deferred_settlement = False>, choices are settled when submitting the final decision
+    # note that <deferred_settlement> requires <results = True> or <batch_settlement = True>
+    deferred_settlement = False
+
+    # store all choices in a single column
+    # if <packed_choices = True>, the choices are stored as a single string (e.g. "AAABBBBBBB") in the model field
+    # <choices_packed>, with the i-th character denoting the option chosen in the choice with index i
+    # if <packed_choices = False>, each choice is stored in a separate model field <choice_i>
+    # note that <packed_choices> is only implemented if <one_choice_per_page = False>
+    packed_choices = False
+
+    # submit the switching row only
+    # if <submit_switching_row = True>, the list of choices posts the switching row (i.e. the row of the first "B"
+    # choice) as a single integer stored in the model field <switching_row>; the choices are implied by the switching
+    # row, such that model fields <choice_i> are not created
+    # if <submit_switching_row = False>, the option chosen in each choice is submitted
+    # note that <submit_switching_row> requires <enforce_consistency = True> and <random_order = False> and is only
+    # implemented if <one_choice_per_page = False>, <bisection = False>, and <packed_choices = False>
+    submit_switching_row = False
+
+    # maximum number of choices
+    # model fields <choice_i> are created for i = 1, 2, ..., <max_num_choices>
+    # sessions overriding <num_choices> in SESSION_CONFIGS may use at most <max_num_choices> choices
+    max_num_choices = num_choices
+
+    # ---------------------------------------------------------------------------------------------------------------- #
+    # --- oTree Settings (Don't Modify) --- #
+    # ---------------------------------------------------------------------------------------------------------------- #
+
+    name_in_url = 'mpl'
+    players_per_group = None
+
+    if one_choice_per_page:
+        if certain_choice:
+            num_rounds = num_choices
+        else:
+            num_rounds = num_choices - 1
+    else:
+        num_rounds = 1
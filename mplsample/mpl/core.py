@@ -0,0 +1,362 @@
+import math
+import random
+from functools import lru_cache
+
+
+# the core logic of the task, i.e. the list of choices, the encoding of choices, consistency, switching rows, and
+# settlement, independent of oTree and Django; <models.py> wraps these functions for the database models, and offline
+# jobs (e.g. <simulate.py>, <estimate.py>) use the batch functions, which take arrays with one entry per player
+# numpy is only imported by the batch functions, such that the module itself imports in a few milliseconds
+
+
+# ******************************************************************************************************************** #
+# *** LIST OF CHOICES
+# ******************************************************************************************************************** #
+
+# indices of the list of choices
+# if <certain_choice = False>, the choice with probability <num_choices> / <num_choices> of outcome "high" is omitted
+# --------------------------------------------------------------------------------------------------------------------
+def choice_indices(num_choices, certain_choice):
+    return list(range(1, num_choices + 1 if certain_choice else num_choices))
+
+
+# probability of outcome "high" in the choice with index <index>
+# --------------------------------------------------------------------------------------------------------------------
+def probability(index, num_choices):
+    return index / num_choices
+
+
+# list of choices, i.e. index, form field, and probability of outcome "high" (as percentage or fraction) per choice
+# --------------------------------------------------------------------------------------------------------------------
+def build_table(num_choices, certain_choice, percentage):
+
+    n = num_choices
+    indices = choice_indices(n, certain_choice)
+
+    if percentage:
+        probabilities = ["{0:.2f}".format(k / n * 100) + "%" for k in indices]
+    else:
+        probabilities = [str(k) + "/" + str(n) for k in indices]
+
+    form_fields = ['choice_' + str(k) for k in indices]
+
+    return tuple(zip(indices, form_fields, probabilities))
+
+
+# display order of the choices with indices 1, ..., <num_rows> given the seed <seed>
+# the order is a random permutation that can be reproduced from the seed, or the order of indices if <seed> is None
+# --------------------------------------------------------------------------------------------------------------------
+def display_order(num_rows, seed=None):
+    order = list(range(1, num_rows + 1))
+    if seed is not None:
+        random.Random(seed).shuffle(order)
+    return tuple(order)
+
+
+# ******************************************************************************************************************** #
+# *** CHOICES
+# ******************************************************************************************************************** #
+
+# choices made are represented by a bitmask with bit <k - 1> set if option "A" has been chosen in the choice with
+# index <k>
+
+# bitmask of the options ("A" or "B") chosen in the choices with indices <indices>
+# --------------------------------------------------------------------------------------------------------------------
+def choices_mask(indices, options):
+    return sum(1 << (k - 1) for k, option in zip(indices, options) if option == 'A')
+
+
+# option chosen in the choice with index <index>
+# --------------------------------------------------------------------------------------------------------------------
+def option(mask, index):
+    return 'A' if mask >> (index - 1) & 1 else 'B'
+
+
+# encode bitmask of choices made as string of options (in the order of indices), e.g. "AAABBBBBBB"
+# --------------------------------------------------------------------------------------------------------------------
+def pack_choices(mask, num_choices):
+    return ''.join('A' if mask >> k & 1 else 'B' for k in range(num_choices))
+
+
+# decode string of options (in the order of indices) into bitmask of choices made
+# --------------------------------------------------------------------------------------------------------------------
+def unpack_choices(packed):
+    return int(packed[::-1].replace('A', '1').replace('B', '0'), 2) if packed else 0
+
+
+# ******************************************************************************************************************** #
+# *** CONSISTENCY AND SWITCHING ROW
+# ******************************************************************************************************************** #
+
+# choices are consistent if all "A" choices precede all "B" choices, i.e. if the bitmask of choices made is of the
+# form 2^k - 1 (with k denoting the number of "A" choices)
+# --------------------------------------------------------------------------------------------------------------------
+def is_consistent(mask):
+    return mask & (mask + 1) == 0
+
+
+# switching row, i.e. the row number of the first "B" choice (None if choices are inconsistent)
+# --------------------------------------------------------------------------------------------------------------------
+def switching_row(mask):
+    return mask.bit_length() + 1 if is_consistent(mask) else None
+
+
+# ******************************************************************************************************************** #
+# *** BISECTION
+# ******************************************************************************************************************** #
+
+# the switching row is known to lie in [lo, hi]; each answer to the choice with index (lo + hi) // 2 halves the range
+
+# initial range of possible switching rows
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_start(num_rows):
+    return [1, num_rows + 1]
+
+
+# next choice to ask (None if the switching row has been elicited)
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_index(lo, hi):
+    return (lo + hi) // 2 if lo < hi else None
+
+
+# update range of possible switching rows given the answer <answer> to the choice with index <index>
+# answers to other choices than the one asked for are ignored
+# --------------------------------------------------------------------------------------------------------------------
+def bisection_step(lo, hi, index, answer):
+    if index is None or index != bisection_index(lo, hi) or answer not in ['A', 'B']:
+        return lo, hi
+    return (index + 1, hi) if answer == 'A' else (lo, index)
+
+
+# bitmask of choices implied by the switching row <row>, i.e. "A" above and "B" from the switching row onwards
+# --------------------------------------------------------------------------------------------------------------------
+def switching_mask(row):
+    return (1 << (row - 1)) - 1
+
+
+# ******************************************************************************************************************** #
+# *** SETTLEMENT
+# ******************************************************************************************************************** #
+
+# payoff if option <option> has been chosen in the decision to pay with index <index_to_pay>
+# the "high" outcome is paid if the random draw is lower than or equal to the index of the decision to pay
+# --------------------------------------------------------------------------------------------------------------------
+def payoff(option, index_to_pay, random_draw, lottery_a_hi, lottery_a_lo, lottery_b_hi, lottery_b_lo):
+    high = random_draw <= index_to_pay
+    if option == 'A':
+        return lottery_a_hi if high else lottery_a_lo
+    return lottery_b_hi if high else lottery_b_lo
+
+
+# ******************************************************************************************************************** #
+# *** CRRA INTERVALS
+# ******************************************************************************************************************** #
+
+# difference in expected CRRA utility, u(x) = (x^(1 - r) - 1) / (1 - r) with u(x) = ln(x) for r = 1, between lottery
+# "A" and lottery "B" given probability <p> of outcome "high"
+# --------------------------------------------------------------------------------------------------------------------
+def crra_difference(r, p, a_hi, a_lo, b_hi, b_lo):
+    if r == 1:
+        u = math.log
+    else:
+        def u(x):
+            return (x ** (1 - r) - 1) / (1 - r)
+    return p * u(a_hi) + (1 - p) * u(a_lo) - p * u(b_hi) - (1 - p) * u(b_lo)
+
+
+# coefficient of relative risk aversion implying indifference between lottery "A" and "B" given probability <p>
+# subjects with a higher coefficient prefer lottery "A"; if the preference does not change within the bracket
+# [-<bound>, <bound>], the indifference point is -inf (lottery "A" always preferred) or inf ("B" always preferred)
+# --------------------------------------------------------------------------------------------------------------------
+def crra_indifference(p, a_hi, a_lo, b_hi, b_lo, bound=10.0, tol=1e-10):
+
+    lo, hi = -bound, bound
+    if crra_difference(lo, p, a_hi, a_lo, b_hi, b_lo) > 0:
+        return -math.inf
+    if crra_difference(hi, p, a_hi, a_lo, b_hi, b_lo) <= 0:
+        return math.inf
+
+    # bisection
+    while hi - lo > tol:
+        mid = (lo + hi) / 2
+        if crra_difference(mid, p, a_hi, a_lo, b_hi, b_lo) > 0:
+            hi = mid
+        else:
+            lo = mid
+    return (lo + hi) / 2
+
+
+# interval of CRRA coefficients implied by each switching row (Holt/Laury, 2002, Table 3)
+# a switching row <s> implies lottery "A" to be preferred in choice <s - 1> and lottery "B" in choice <s>, i.e. a
+# coefficient in between the indifference points of both choices; the interval for switching row <s> is given by
+# element <s - 1>, with unbounded limits denoted by None
+# indifference points are evaluated at the probability of outcome "high" displayed for each choice (<probability>),
+# which is the probability with which settlement pays the "high" outcome (see <batch_draw>)
+# the table is built once per parameterization by root-finding the indifference points
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def crra_intervals(num_choices, certain_choice, a_hi, a_lo, b_hi, b_lo):
+
+    indices = choice_indices(num_choices, certain_choice)
+    points = [-math.inf] + [
+        crra_indifference(probability(k, num_choices), a_hi, a_lo, b_hi, b_lo) for k in indices
+    ] + [math.inf]
+
+    return tuple(
+        tuple(None if math.isinf(r) else r for r in points[s - 1:s + 1])
+        for s in range(1, len(indices) + 2)
+    )
+
+
+# ******************************************************************************************************************** #
+# *** ADMIN REPORT
+# ******************************************************************************************************************** #
+
+# running aggregates of a session, i.e. the number of participants who completed the task and of those with
+# inconsistent choices, counts of switching rows and of completion times (in seconds), and the number and total of
+# payoffs set; aggregates are updated in O(1) per participant, and counts are keyed by strings to be stored as JSON
+# --------------------------------------------------------------------------------------------------------------------
+def report_start():
+    return {'completed': 0, 'inconsistent': 0, 'switching_rows': {}, 'seconds': {}, 'paid': 0, 'payoff_total': 0.0}
+
+
+# add a participant who completed the task with switching row <switching_row> (None if choices are inconsistent)
+# after <seconds> seconds
+# --------------------------------------------------------------------------------------------------------------------
+def report_result(report, switching_row, seconds):
+
+    report['completed'] += 1
+    if switching_row is None:
+        report['inconsistent'] += 1
+    else:
+        key = str(switching_row)
+        report['switching_rows'][key] = report['switching_rows'].get(key, 0) + 1
+
+    if seconds is not None:
+        key = str(int(seconds))
+        report['seconds'][key] = report['seconds'].get(key, 0) + 1
+
+    return report
+
+
+# add payoffs <payoffs>
+# --------------------------------------------------------------------------------------------------------------------
+def report_payoffs(report, payoffs):
+    for x in payoffs:
+        report['paid'] += 1
+        report['payoff_total'] += float(x)
+    return report
+
+
+# median of the values counted in <counts> (None if there are no values)
+# --------------------------------------------------------------------------------------------------------------------
+def counts_median(counts):
+
+    n = sum(counts.values())
+    if n == 0:
+        return None
+
+    def element(rank):
+        cumulative = 0
+        for value, count in sorted((int(k), v) for k, v in counts.items()):
+            cumulative += count
+            if cumulative > rank:
+                return value
+
+    return (element((n - 1) // 2) + element(n // 2)) / 2
+
+
+# summary of the running aggregates, i.e. the distribution of switching rows 1 to <num_rows> + 1 (as rows of
+# switching row, count, and percentage), the inconsistency rate, the median completion time, and total and mean payoff
+# --------------------------------------------------------------------------------------------------------------------
+def report_summary(report, num_rows):
+
+    completed = report['completed']
+    counts = [(s, report['switching_rows'].get(str(s), 0)) for s in range(1, num_rows + 2)]
+
+    return {
+        'completed':          completed,
+        'switching_rows':     [(s, n, n / completed * 100 if completed else 0) for s, n in counts],
+        'inconsistent':       report['inconsistent'],
+        'inconsistency_rate': report['inconsistent'] / completed * 100 if completed else None,
+        'median_seconds':     counts_median(report['seconds']),
+        'paid':               report['paid'],
+        'payoff_total':       report['payoff_total'],
+        'payoff_mean':        report['payoff_total'] / report['paid'] if report['paid'] else None
+    }
+
+
+# ******************************************************************************************************************** #
+# *** BATCH FUNCTIONS
+# ******************************************************************************************************************** #
+
+# bitmasks of choices made for a boolean array <option_a> (players x choices, in the order of indices), which is True
+# if option "A" has been chosen
+# --------------------------------------------------------------------------------------------------------------------
+def batch_masks(option_a):
+    import numpy as np
+    option_a = np.asarray(option_a, dtype=np.int64)
+    return option_a @ (np.int64(1) << np.arange(option_a.shape[-1], dtype=np.int64))
+
+
+# consistency for an array of bitmasks (1 if inconsistent, 0 otherwise)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_inconsistent(masks):
+    import numpy as np
+    masks = np.asarray(masks, dtype=np.int64)
+    return (masks & (masks + 1) != 0).astype(int)
+
+
+# switching rows for an array of bitmasks (-1 if choices are inconsistent)
+# the bit length of 2^k - 1 is given by the binary exponent of 2^k
+# --------------------------------------------------------------------------------------------------------------------
+def batch_switching_rows(masks):
+    import numpy as np
+    masks = np.asarray(masks, dtype=np.int64)
+    rows = np.frexp((masks + 1).astype(float))[1]
+    return np.where(batch_inconsistent(masks) == 0, rows, -1)
+
+
+# random draws to determine whether to pay the "high" or "low" outcome of the lotteries to pay
+# draws are uniformly distributed on {1, ..., <num_choices>}, such that the "high" outcome of the decision with index
+# <k> is paid with probability <k> / <num_choices> (see <probability>)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_draw(num_players, num_choices, rng=None):
+    import numpy as np
+    rng = np.random.default_rng() if rng is None else rng
+    return rng.integers(1, num_choices + 1, size=num_players)
+
+
+# decisions to pay and random draws of <num_players> players, drawn at once from the seed <seed>
+# indices to pay are uniformly distributed on <indices> and random draws are distributed as in <batch_draw>; all
+# payments of a session can be reproduced offline from its seed (with players in the order of <id_in_subsession>)
+# --------------------------------------------------------------------------------------------------------------------
+def batch_payments(num_players, indices, num_choices, seed=None):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    index_to_pay = rng.choice(np.asarray(indices), size=num_players)
+    return index_to_pay, batch_draw(num_players, num_choices, rng)
+
+
+# options chosen in the decisions to pay
+# returns True for each player who has chosen option "A" in the decision with index <index_to_pay>
+# --------------------------------------------------------------------------------------------------------------------
+def batch_chosen_a(masks, index_to_pay):
+    import numpy as np
+    return (np.asarray(masks, dtype=np.int64) >> (np.asarray(index_to_pay, dtype=np.int64) - 1)) & 1 == 1
+
+
+# payoffs for a batch of players
+# <index_to_pay>, <option_a>, and <draws> are arrays with one entry per player, where <option_a> is True if lottery "A"
+# has been chosen in the decision to pay
+# --------------------------------------------------------------------------------------------------------------------
+def batch_settle(index_to_pay, option_a, draws, lottery_a_hi, lottery_a_lo, lottery_b_hi, lottery_b_lo):
+    import numpy as np
+
+    high = np.asarray(draws) <= np.asarray(index_to_pay)
+
+    return np.where(
+        np.asarray(option_a, dtype=bool),
+        np.where(high, lottery_a_hi, lottery_a_lo),
+        np.where(high, lottery_b_hi, lottery_b_lo)
+    )
@@ -1,162 +1,589 @@
-from otree.api import (
-    models, widgets, BaseConstants, BaseSubsession, BaseGroup, BasePlayer,
-    Currency as c, currency_range
-)
-from mpl.config import *
-import random
-from random import randrange
-
-
-author = 'Felix Holzmeister'
-
-doc = """
-Multiple price list task as proposed by Holt/Laury (2002), American Economic Review 92(5).
-"""
-
-
-# ******************************************************************************************************************** #
-# *** CLASS SUBSESSION
-# ******************************************************************************************************************** #
-class Subsession(BaseSubsession):
-
-    def creating_session(self):
-        if self.round_number == 1:
-
-            n = Constants.num_choices
-            for p in self.get_players():
-
-                # create list of lottery indices
-                # ----------------------------------------------------------------------------------------------------
-                indices = [j for j in range(1, n)]
-                indices.append(n) if Constants.certain_choice else None
-
-                # create list of probabilities
-                # ----------------------------------------------------------------------------------------------------
-                if Constants.percentage:
-                    probabilities = [
-                        "{0:.2f}".format(k / n * 100) + "%"
-                        for k in indices
-                    ]
-                else:
-                    probabilities = [
-                        str(k) + "/" + str(n)
-                        for k in indices
-                    ]
-
-                # create list corresponding to form_field variables including all choices
-                # ----------------------------------------------------------------------------------------------------
-                form_fields = ['choice_' + str(k) for k in indices]
-
-                # create list of choices
-                # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['mpl_choices'] = list(
-                    zip(indices, form_fields, probabilities)
-                )
-
-                # randomly determine index/choice of binary decision to pay
-                # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['mpl_index_to_pay'] = random.choice(indices)
-                p.participant.vars['mpl_choice_to_pay'] = 'choice_' + str(p.participant.vars['mpl_index_to_pay'])
-
-                # randomize order of lotteries if <random_order = True>
-                # ----------------------------------------------------------------------------------------------------
-                if Constants.random_order:
-                    random.shuffle(p.participant.vars['mpl_choices'])
-
-                # initiate list for choices made
-                # ----------------------------------------------------------------------------------------------------
-                p.participant.vars['mpl_choices_made'] = [None for j in range(1, n + 1)]
-
-            # generate random switching point for PlayerBot in tests.py
-            # --------------------------------------------------------------------------------------------------------
-            for participant in self.session.get_participants():
-                participant.vars['mpl_switching_point'] = random.randint(1, n)
-
-
-# ******************************************************************************************************************** #
-# *** CLASS GROUP
-# ******************************************************************************************************************** #
-class Group(BaseGroup):
-    pass
-
-
-# ******************************************************************************************************************** #
-# *** CLASS PLAYER
-# ******************************************************************************************************************** #
-class Player(BasePlayer):
-
-    # add model fields to class player
-    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-    if Constants.certain_choice:
-        for j in range(1, Constants.num_choices + 1):
-            locals()['choice_' + str(j)] = models.StringField()
-        del j
-    else:
-        for j in range(1, Constants.num_choices):
-            locals()['choice_' + str(j)] = models.StringField()
-        del j
-
-    random_draw = models.IntegerField()
-    choice_to_pay = models.StringField()
-    option_to_pay = models.StringField()
-    inconsistent = models.IntegerField()
-    switching_row = models.IntegerField()
-
-    # set player's payoff
-    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-    def set_payoffs(self):
-
-        # random draw to determine whether to pay the "high" or "low" outcome of the randomly picked lottery
-        # ------------------------------------------------------------------------------------------------------------
-        self.random_draw = randrange(1, len(self.participant.vars['mpl_choices']))
-
-        # set <choice_to_pay> to participant.var['choice_to_pay'] determined creating_session
-        # ------------------------------------------------------------------------------------------------------------
-        self.choice_to_pay = self.participant.vars['mpl_choice_to_pay']
-
-        # elicit whether lottery "A" or "B" was chosen for the respective choice
-        # ------------------------------------------------------------------------------------------------------------
-        self.option_to_pay = getattr(self, self.choice_to_pay)
-
-        # set player's payoff
-        # ------------------------------------------------------------------------------------------------------------
-        if self.option_to_pay == 'A':
-            if self.random_draw <= self.participant.vars['mpl_index_to_pay']:
-                self.payoff = Constants.lottery_a_hi
-            else:
-                self.payoff = Constants.lottery_a_lo
-        else:
-            if self.random_draw <= self.participant.vars['mpl_index_to_pay']:
-                self.payoff = Constants.lottery_b_hi
-            else:
-                self.payoff = Constants.lottery_b_lo
-
-        # set payoff as global variable
-        # ------------------------------------------------------------------------------------------------------------
-        self.participant.vars['mpl_payoff'] = self.payoff
-
-    # determine consistency
-    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-    def set_consistency(self):
-
-        n = Constants.num_choices
-
-        # replace A's by 1's and B's by 0's
-        self.participant.vars['mpl_choices_made'] = [
-            1 if j == 'A' else 0 for j in self.participant.vars['mpl_choices_made']
-        ]
-
-        # check for multiple switching behavior
-        for j in range(1, n):
-            choices = self.participant.vars['mpl_choices_made']
-            self.inconsistent = 1 if choices[j] > choices[j - 1] else 0
-            if self.inconsistent == 1:
-                break
-
-    # determine switching row
-    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-    def set_switching_row(self):
-
-        # set switching point to row number of first 'B' choice
-        if self.inconsistent == 0:
-            self.switching_row = sum(self.participant.vars['mpl_choices_made']) + 1
+from otree.api import (
+    models, widgets, BaseConstants, BaseSubsession, BaseGroup, BasePlayer,
+    Currency as c, currency_range
+)
+from mpl import config
+import math
+import random
+from functools import lru_cache
+from collections import namedtuple
+from . import core, benchmark
+
+
+author = 'Felix Holzmeister'
+
+doc = """
+Multiple price list task as proposed by Holt/Laury (2002), American Economic Review 92(5).
+"""
+
+
+# ******************************************************************************************************************** #
+# *** CONSTANTS
+# ******************************************************************************************************************** #
+
+# parameters set in config.py as oTree constants
+# --------------------------------------------------------------------------------------------------------------------
+class Constants(BaseConstants, config.Constants):
+    pass
+
+
+# ******************************************************************************************************************** #
+# *** CHOICE TABLE
+# ******************************************************************************************************************** #
+
+# list of choices for a given parameterization
+# the list is built once per parameterization and shared by all participants; participants only store the seed of the
+# order in which the indices are displayed (<mpl_seed>)
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def choice_table(num_choices, certain_choice, percentage):
+
+    # create list of indices, form fields, and probabilities
+    # ----------------------------------------------------------------------------------------------------------------
+    rows = core.build_table(num_choices, certain_choice, percentage)
+
+    # add pie charts depicting the probabilities of outcomes
+    # ----------------------------------------------------------------------------------------------------------------
+    return tuple((i, f, p, pie_chart(i, num_choices)) for i, f, p in rows)
+
+
+# pie chart (inline svg) depicting a probability of <numerator> / <denominator> for outcome "high"
+# pie charts are rendered on the server and cached per probability; their size is set in custom.css
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def pie_chart(numerator, denominator, colors=('#afcede', '#b3b3b3')):
+
+    share = numerator / denominator
+    svg = '<svg viewBox="0 0 100 100" aria-hidden="true">{}</svg>'
+
+    # full circle if one of the outcomes is certain
+    # ----------------------------------------------------------------------------------------------------------------
+    if share <= 0 or share >= 1:
+        return svg.format('<circle cx="50" cy="50" r="47.5" fill="{}"/>'.format(colors[0 if share >= 1 else 1]))
+
+    # slices of outcome "high" (clockwise from the top) and outcome "low"
+    # ----------------------------------------------------------------------------------------------------------------
+    x = 50 + 47.5 * math.sin(2 * math.pi * share)
+    y = 50 - 47.5 * math.cos(2 * math.pi * share)
+    large_arc = 1 if share > 0.5 else 0
+
+    return svg.format(
+        '<path d="M50,50 L50,2.5 A47.5,47.5 0 {0},1 {2:.3f},{3:.3f} Z" fill="{4}"/>'
+        '<path d="M50,50 L{2:.3f},{3:.3f} A47.5,47.5 0 {1},1 50,2.5 Z" fill="{5}"/>'.format(
+            large_arc, 1 - large_arc, x, y, *colors
+        )
+    )
+
+
+# participant's view on the list of choices, i.e. the list in display order (<choices>), the indices and form fields
+# in display order (<indices>, <form_fields>), and the display position of each index (<position>, with the position
+# of index <k> given by <position[k - 1]>)
+# --------------------------------------------------------------------------------------------------------------------
+ChoiceView = namedtuple('ChoiceView', ['choices', 'indices', 'form_fields', 'position'])
+
+
+# participant's view for a given list of choices (key <table>) and seed of the display order (<mpl_seed>)
+# views are cached such that pages do not need to re-arrange the list on each request
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def choice_view(table, seed):
+
+    rows = choice_table(*table)
+    order = core.display_order(len(rows), seed)
+    choices = tuple(rows[k - 1] for k in order)
+
+    position = [None] * len(rows)
+    for i, k in enumerate(order, start=1):
+        position[k - 1] = i
+
+    return ChoiceView(
+        choices=choices,
+        indices=tuple(order),
+        form_fields=tuple(j[1] for j in choices),
+        position=tuple(position)
+    )
+
+
+# ******************************************************************************************************************** #
+# *** TASK SPECIFICATION
+# ******************************************************************************************************************** #
+
+# parameters of <Constants> that can be set per session by adding them to an entry of SESSION_CONFIGS in settings.py,
+# e.g. dict(name='mpl_percentage', app_sequence=['mpl'], num_demo_participants=2, percentage=True)
+# <one_choice_per_page>, <bisection>, <packed_choices>, <submit_switching_row>, and <max_num_choices> determine the
+# rounds, pages, and model fields of the app and can only be set in config.py
+# --------------------------------------------------------------------------------------------------------------------
+PARAMETERS = (
+    'lottery_a_hi', 'lottery_a_lo', 'lottery_b_hi', 'lottery_b_lo', 'num_choices', 'certain_choice', 'paginated',
+    'random_order', 'enforce_consistency', 'percentage', 'small_pies', 'large_pies', 'progress_bar', 'instructions',
+    'results', 'batch_settlement', 'deferred_settlement'
+)
+
+
+# task specification, i.e. the parameters of a session, the key of its list of choices (<table>), the list of choices
+# (<rows>) and its indices, and the lottery payoffs in currency units for templates (<labels>)
+# --------------------------------------------------------------------------------------------------------------------
+TaskSpec = namedtuple('TaskSpec', PARAMETERS + ('table', 'rows', 'indices', 'labels'))
+
+
+# key identifying the parameterization of a session, i.e. its parameters in the order of <PARAMETERS>
+# --------------------------------------------------------------------------------------------------------------------
+def spec_key(config):
+    return tuple(config.get(k, getattr(Constants, k)) for k in PARAMETERS)
+
+
+# task specification for a given parameterization
+# each distinct parameterization is compiled once and shared by all sessions, participants, and requests
+# --------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def task_spec(key):
+
+    params = dict(zip(PARAMETERS, key))
+    table = (params['num_choices'], params['certain_choice'], params['percentage'])
+    rows = choice_table(*table)
+
+    # check parameters against the rounds and model fields set up in config.py
+    # ----------------------------------------------------------------------------------------------------------------
+    if rows[-1][0] > Constants.max_num_choices:
+        raise ValueError('num_choices exceeds max_num_choices set in config.py')
+    if rows[-1][0] > 31:
+        raise ValueError('num_choices exceeds 31, the number of choices held by the integer field choices_made')
+    if Constants.one_choice_per_page and len(rows) != Constants.num_rounds:
+        raise ValueError('num_choices and certain_choice cannot be changed per session if one_choice_per_page = True')
+
+    if Constants.submit_switching_row and (params['random_order'] or not params['enforce_consistency']):
+        raise ValueError('submit_switching_row requires enforce_consistency = True and random_order = False')
+    if params['deferred_settlement'] and not (params['results'] or params['batch_settlement']):
+        raise ValueError('deferred_settlement requires results = True or batch_settlement = True')
+
+    return TaskSpec(
+        table=table,
+        rows=rows,
+        indices=tuple(j[0] for j in rows),
+        labels=tuple((k, c(params[k])) for k in ['lottery_a_lo', 'lottery_a_hi', 'lottery_b_lo', 'lottery_b_hi']),
+        **params
+    )
+
+
+# task specification of a session
+# --------------------------------------------------------------------------------------------------------------------
+def session_spec(session):
+    return task_spec(spec_key(session.config))
+
+
+# ******************************************************************************************************************** #
+# *** CRRA INTERVALS
+# ******************************************************************************************************************** #
+
+# key identifying the parameterization relevant for the implied CRRA intervals
+# --------------------------------------------------------------------------------------------------------------------
+def crra_key(spec):
+    return (
+        spec.num_choices, spec.certain_choice,
+        float(spec.lottery_a_hi), float(spec.lottery_a_lo),
+        float(spec.lottery_b_hi), float(spec.lottery_b_lo)
+    )
+
+
+# ******************************************************************************************************************** #
+# *** CLASS SUBSESSION
+# ******************************************************************************************************************** #
+class Subsession(BaseSubsession):
+
+    @benchmark.timed('Subsession.creating_session')
+    def creating_session(self):
+        if self.round_number == 1:
+
+            # get (shared) task specification of the session
+            # --------------------------------------------------------------------------------------------------------
+            spec = self.get_spec()
+            indices = spec.indices
+            players = self.get_players()
+
+            # initiate running aggregates of the admin report
+            # --------------------------------------------------------------------------------------------------------
+            self.session.mpl_report = core.report_start()
+
+            # draw decisions to pay and random numbers of all players at once from the session's payment seed
+            # --------------------------------------------------------------------------------------------------------
+            self.session.mpl_payment_seed = random.getrandbits(64)
+            index_to_pay, draws = core.batch_payments(
+                len(players), indices, spec.num_choices, self.session.mpl_payment_seed
+            )
+
+            for p, k, d in zip(players, index_to_pay.tolist(), draws.tolist()):
+
+                # store index/choice of binary decision to pay and random draw to determine whether to pay the "high"
+                # or "low" outcome of the lottery to pay
+                # the task state of the participant is stored in model fields of the player of round 1 (see
+                # <get_task_player>)
+                # ----------------------------------------------------------------------------------------------------
+                p.index_to_pay = k
+                p.choice_to_pay = 'choice_' + str(k)
+                p.random_draw = d
+
+                # randomize order of lotteries if <random_order = True>
+                # only the seed of the order is stored; the order is derived from the seed when the view is built
+                # ----------------------------------------------------------------------------------------------------
+                p.participant.mpl_seed = random.getrandbits(32) if spec.random_order else None
+
+                # initiate bitmask for choices made
+                # bit <k - 1> is set if option "A" has been chosen in the choice with index <k>
+                # ----------------------------------------------------------------------------------------------------
+                p.choices_made = 0
+
+                # choices are settled on the final submit unless settlement is deferred
+                # ----------------------------------------------------------------------------------------------------
+                p.settled = not spec.deferred_settlement
+
+                # initiate start and completion time of the task (in seconds) for the admin report
+                # ----------------------------------------------------------------------------------------------------
+                p.participant.mpl_started = None
+                p.participant.mpl_seconds = None
+
+                # initiate range of possible switching rows for <bisection = True>
+                # ----------------------------------------------------------------------------------------------------
+                p.participant.mpl_bisection = core.bisection_start(len(indices))
+
+            # generate random switching point for PlayerBot in tests.py
+            # --------------------------------------------------------------------------------------------------------
+            for participant in self.session.get_participants():
+                participant.mpl_switching_point = random.randint(1, spec.num_choices)
+
+    # get (cached) task specification of the session
+    # ----------------------------------------------------------------------------------------------------------------
+    def get_spec(self):
+        return session_spec(self.session)
+
+    # variables for the admin report, i.e. a summary of the running aggregates of the session
+    # the aggregates are updated as participants complete the task, such that the report does not scan all players
+    # ----------------------------------------------------------------------------------------------------------------
+    def vars_for_admin_report(self):
+        self.settle_pending()
+        summary = core.report_summary(self.session.mpl_report, len(self.get_spec().indices))
+        summary['payoff_total'] = c(summary['payoff_total'])
+        summary['payoff_mean'] = c(summary['payoff_mean']) if summary['payoff_mean'] is not None else None
+        return summary
+
+    # settle players who completed the task but whose choices have not been settled via the page "Results" (if
+    # <deferred_settlement = True>), e.g. as they closed the page before it requested settlement; players are settled
+    # once the admin report is viewed, such that the report (and the export) covers all players who completed the task
+    # ----------------------------------------------------------------------------------------------------------------
+    def settle_pending(self):
+        spec = self.get_spec()
+        if not spec.deferred_settlement or spec.batch_settlement:
+            return
+        for p in self.in_round(Constants.num_rounds).get_players():
+            if p.participant.mpl_seconds is not None and not p.get_task_player().settled:
+                p.settle()
+
+    # settle payoffs of all players in the session at once (if <batch_settlement = True>)
+    # ----------------------------------------------------------------------------------------------------------------
+    @benchmark.timed('Subsession.set_payoffs')
+    def set_payoffs(self):
+
+        # get player objects holding the task state (<tasks>) and the decision to pay (<players>)
+        # ------------------------------------------------------------------------------------------------------------
+        spec = self.get_spec()
+        players = self.get_players()
+        tasks = players
+
+        if Constants.one_choice_per_page:
+            rounds = {
+                s.round_number: {p.participant.id_in_session: p for p in s.get_players()}
+                for s in self.in_rounds(1, Constants.num_rounds)
+            }
+            tasks = [rounds[1][p.participant.id_in_session] for p in players]
+            players = [
+                rounds[
+                    t.get_view().position[t.index_to_pay - 1]
+                ][t.participant.id_in_session]
+                for t in tasks
+            ]
+
+        # pack decisions to pay and random draws of all players
+        # ------------------------------------------------------------------------------------------------------------
+        choice_to_pay = [t.choice_to_pay for t in tasks]
+        index_to_pay = [t.index_to_pay for t in tasks]
+        option_a = core.batch_chosen_a([t.choices_made for t in tasks], index_to_pay)
+        draws = [t.random_draw for t in tasks]
+
+        # determine payoffs
+        # ------------------------------------------------------------------------------------------------------------
+        payoffs = core.batch_settle(
+            index_to_pay,
+            option_a,
+            draws,
+            spec.lottery_a_hi,
+            spec.lottery_a_lo,
+            spec.lottery_b_hi,
+            spec.lottery_b_lo
+        )
+
+        # write results to players
+        # ------------------------------------------------------------------------------------------------------------
+        for p, f, a, d, x in zip(players, choice_to_pay, option_a, draws, payoffs.tolist()):
+            p.random_draw = d
+            p.choice_to_pay = f
+            p.option_to_pay = 'A' if a else 'B'
+            p.payoff = x
+            p.participant.mpl_payoff = p.payoff
+
+        # add payoffs to the admin report
+        # ------------------------------------------------------------------------------------------------------------
+        self.session.mpl_report = core.report_payoffs(self.session.mpl_report, payoffs.tolist())
+
+        # determine consistency and switching rows if settlement has been deferred
+        # ------------------------------------------------------------------------------------------------------------
+        if spec.deferred_settlement:
+            for p, t in zip(self.get_players(), tasks):
+                p.set_consistency()
+                p.set_switching_row()
+                p.add_to_report()
+                t.settled = True
+
+
+# ******************************************************************************************************************** #
+# *** CLASS GROUP
+# ******************************************************************************************************************** #
+class Group(BaseGroup):
+    pass
+
+
+# ******************************************************************************************************************** #
+# *** CLASS PLAYER
+# ******************************************************************************************************************** #
+class Player(BasePlayer):
+
+    # add model fields to class player
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    if Constants.packed_choices:
+        choices_packed = models.StringField()
+    elif not Constants.submit_switching_row:
+        for j in range(1, Constants.max_num_choices + 1):
+            locals()['choice_' + str(j)] = models.StringField()
+        del j
+
+    random_draw = models.IntegerField()
+    choice_to_pay = models.StringField()
+    option_to_pay = models.StringField()
+    inconsistent = models.IntegerField()
+    switching_row = models.IntegerField()
+    crra_lower = models.FloatField()
+    crra_upper = models.FloatField()
+
+    # task state of the participant, i.e. the decision to pay and random draw (set in creating_session), the bitmask of
+    # choices made (bit <k - 1> is set if option "A" has been chosen in the choice with index <k>), and whether choices
+    # have been settled; the state is read and updated on (almost) every request and stored in typed columns of the
+    # player of round 1 (see <get_task_player>), whose fields hold the results of the task if choices are settled in
+    # the same round
+    index_to_pay = models.IntegerField()
+    choices_made = models.IntegerField()
+    settled = models.BooleanField()
+
+    # get (cached) task specification of the session
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_spec(self):
+        return session_spec(self.session)
+
+    # get player holding the task state of the participant, i.e. the player of round 1, which is shared by all rounds
+    # if <one_choice_per_page = True>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_task_player(self):
+        return self if self.round_number == 1 else self.in_round(1)
+
+    # get (cached) view on the list of choices in the order displayed to the participant
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_view(self):
+        return choice_view(self.get_spec().table, self.participant.mpl_seed)
+
+    # get list of choices in the order displayed to the participant
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_choices(self):
+        return self.get_view().choices
+
+    # option submitted in the choice with index <index>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_choice(self, index):
+        if Constants.packed_choices:
+            return self.choices_packed[index - 1] if index <= len(self.choices_packed or '') else None
+        if Constants.submit_switching_row:
+            if self.switching_row is None or index > len(self.get_spec().indices):
+                return None
+            return 'A' if index < self.switching_row else 'B'
+        return getattr(self, 'choice_' + str(index))
+
+    # set all choices implied by the bitmask <mask>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def set_choices(self, mask):
+        indices = self.get_spec().indices
+        if Constants.packed_choices:
+            self.choices_packed = core.pack_choices(mask, len(indices))
+        else:
+            for k in indices:
+                setattr(self, 'choice_' + str(k), 'A' if mask >> (k - 1) & 1 else 'B')
+
+    # elicit switching row by bisection (live method of page Decision if <bisection = True>)
+    # the switching row is known to lie in [lo, hi]; each answer to the choice with index (lo + hi) // 2 halves it
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def live_bisection(self, data):
+
+        # update range of possible switching rows given the answer to the current choice
+        # ------------------------------------------------------------------------------------------------------------
+        lo, hi = core.bisection_step(*self.participant.mpl_bisection, data.get('index'), data.get('answer'))
+        self.participant.mpl_bisection = [lo, hi]
+
+        # send next choice to display
+        # ------------------------------------------------------------------------------------------------------------
+        index = core.bisection_index(lo, hi)
+        if index is not None:
+            return {self.id_in_group: {'index': index}}
+
+        # set choices implied by the switching row, i.e. "A" above and "B" from the switching row onwards
+        # ------------------------------------------------------------------------------------------------------------
+        self.get_task_player().choices_made = core.switching_mask(lo)
+        return {self.id_in_group: {'done': True}}
+
+    # settle choices, i.e. determine consistency, switching row, and payoff (if <deferred_settlement = True>)
+    # in case of <one_choice_per_page = True>, the payoff is set in the round of the decision to pay
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    @benchmark.timed('Player.settle')
+    def settle(self):
+
+        task = self.get_task_player()
+        if task.settled:
+            return
+
+        self.set_consistency()
+        self.set_switching_row()
+        self.add_to_report()
+
+        if not self.get_spec().batch_settlement:
+            if Constants.one_choice_per_page:
+                self.in_round(self.get_view().position[task.index_to_pay - 1]).set_payoffs()
+            else:
+                self.set_payoffs()
+
+        task.settled = True
+
+    # settle choices once the page "Results" has been loaded (live method of page Results, if
+    # <deferred_settlement = True>)
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def live_settlement(self, data):
+        if not self.get_spec().deferred_settlement:
+            return
+        self.settle()
+        return {self.id_in_group: {'settled': True}}
+
+    # set player's payoff
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def set_payoffs(self):
+
+        # random draw to determine whether to pay the "high" or "low" outcome of the randomly picked lottery
+        # (drawn in creating_session and stored in the task state of the player of round 1)
+        # ------------------------------------------------------------------------------------------------------------
+        task = self.get_task_player()
+        self.random_draw = task.random_draw
+
+        # set <choice_to_pay> to the decision to pay determined in creating_session
+        # ------------------------------------------------------------------------------------------------------------
+        self.choice_to_pay = task.choice_to_pay
+
+        # elicit whether lottery "A" or "B" was chosen for the respective choice
+        # ------------------------------------------------------------------------------------------------------------
+        self.option_to_pay = self.get_option(task.index_to_pay)
+
+        # set player's payoff
+        # ------------------------------------------------------------------------------------------------------------
+        spec = self.get_spec()
+        self.payoff = core.payoff(
+            self.option_to_pay,
+            task.index_to_pay,
+            self.random_draw,
+            spec.lottery_a_hi,
+            spec.lottery_a_lo,
+            spec.lottery_b_hi,
+            spec.lottery_b_lo
+        )
+
+        # set payoff as global variable
+        # ------------------------------------------------------------------------------------------------------------
+        self.participant.mpl_payoff = self.payoff
+
+        # add payoff to the admin report
+        # ------------------------------------------------------------------------------------------------------------
+        self.session.mpl_report = core.report_payoffs(self.session.mpl_report, [self.payoff])
+
+    # option chosen in the choice with index <index>
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def get_option(self, index):
+        return core.option(self.get_task_player().choices_made, index)
+
+    # determine consistency
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def set_consistency(self):
+
+        # choices are consistent if all "A" choices precede all "B" choices
+        self.inconsistent = 0 if core.is_consistent(self.get_task_player().choices_made) else 1
+
+    # determine switching row
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def set_switching_row(self):
+
+        # set switching point to row number of first 'B' choice
+        if self.inconsistent == 0:
+            self.switching_row = core.switching_row(self.get_task_player().choices_made)
+
+            # look up interval of CRRA coefficients implied by the switching row
+            self.crra_lower, self.crra_upper = core.crra_intervals(*crra_key(self.get_spec()))[self.switching_row - 1]
+
+    # add switching row (or inconsistency) and completion time to the running aggregates of the admin report
+    # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+    def add_to_report(self):
+        self.session.mpl_report = core.report_result(
+            self.session.mpl_report, self.switching_row, self.participant.mpl_seconds
+        )
+
+
+# ******************************************************************************************************************** #
+# *** CUSTOM EXPORT
+# ******************************************************************************************************************** #
+
+# export one row per participant and decision (long format), joining the option chosen (<option>) with the parameters
+# of the choice and its position in the participant's display order (<position>); <to_pay> is 1 for the decision to pay
+# and the player's results (e.g. <switching_row>, <payoff>) are repeated in each of the player's rows
+# <payment_seed> is the seed of the session's payments, <order_seed> the seed of the participant's display order (empty
+# if <random_order = False>)
+# rows are generated one at a time, such that the memory footprint does not grow with the number of participants
+# --------------------------------------------------------------------------------------------------------------------
+def custom_export(players):
+
+    # header row
+    yield [
+        'session', 'participant', 'round_number', 'payment_seed', 'order_seed', 'index', 'position', 'probability',
+        'lottery_a_hi', 'lottery_a_lo', 'lottery_b_hi', 'lottery_b_lo', 'option', 'to_pay', 'random_draw',
+        'option_to_pay', 'inconsistent', 'switching_row', 'crra_lower', 'crra_upper', 'payoff'
+    ]
+
+    # one row per player and decision
+    for p in players:
+        spec = p.get_spec()
+        view = p.get_view()
+
+        # decisions of the player, i.e. only the decision of the current round if <one_choice_per_page = True>
+        indices = [view.indices[p.round_number - 1]] if Constants.one_choice_per_page else spec.indices
+        index_to_pay = p.get_task_player().index_to_pay
+
+        player = [
+            p.session.code, p.participant.code, p.round_number, p.session.mpl_payment_seed, p.participant.mpl_seed
+        ]
+        results = [
+            p.random_draw, p.option_to_pay, p.inconsistent, p.switching_row, p.crra_lower, p.crra_upper, p.payoff
+        ]
+
+        for k in indices:
+            yield player + [
+                k, view.position[k - 1], core.probability(k, spec.num_choices),
+                spec.lottery_a_hi, spec.lottery_a_lo, spec.lottery_b_hi, spec.lottery_b_lo,
+                p.get_choice(k), int(k == index_to_pay)
+            ] + results
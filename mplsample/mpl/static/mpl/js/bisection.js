@@ -0,0 +1,29 @@
+var current = null;
+
+$(document).ready(function () {
+    $('.otree-btn-next').hide();
+    $('tbody tr').hide();
+    $('input[type=radio]').prop('required', false);
+
+    // send answer to the current choice
+    $('input[type=radio]').change(
+        function () {
+            liveSend({'index': current, 'answer': this.value});
+        }
+    );
+
+    // request first choice
+    liveSend({});
+});
+
+// display the choice requested or submit the page once the switching row has been elicited
+function liveRecv(data) {
+    if (data.done) {
+        $('#form').submit();
+        return;
+    }
+
+    current = data.index;
+    $('tbody tr').hide();
+    $('tbody tr[data-index=' + current + ']').show();
+}
\ No newline at end of file
@@ -0,0 +1,10 @@
+// request settlement of the choices made and display the results once settled
+function liveRecv(data) {
+    if (data.settled) {
+        window.location.reload();
+    }
+}
+
+$(document).ready(function () {
+    liveSend({});
+});
\ No newline at end of file
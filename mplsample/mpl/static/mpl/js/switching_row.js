@@ -0,0 +1,14 @@
+$(document).ready(function () {
+    $('form').submit(
+        function () {
+            var rows = $('tbody tr');
+
+            // switching row, i.e. the row of the first "B" choice (number of rows plus 1 if "A" is chosen throughout)
+            var first = rows.index(rows.has('input[value=B]:checked').first());
+            $('#id_switching_row').val(first === -1 ? rows.length + 1 : first + 1);
+
+            // only the switching row is submitted
+            $('input[type=radio]').prop('disabled', true);
+        }
+    );
+});
\ No newline at end of file
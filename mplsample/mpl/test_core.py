@@ -0,0 +1,145 @@
+import numpy as np
+from mpl import core
+
+
+# ******************************************************************************************************************** #
+# *** CHOICES
+# ******************************************************************************************************************** #
+
+# bitmasks of choices made (bit <k - 1> set for "A" in choice <k>) and their packed form in the order of indices
+# --------------------------------------------------------------------------------------------------------------------
+def test_choices_mask():
+    mask = core.choices_mask([1, 2, 3, 4], ['A', 'B', 'A', 'B'])
+    assert mask == 0b0101
+    assert [core.option(mask, k) for k in [1, 2, 3, 4]] == ['A', 'B', 'A', 'B']
+    assert core.pack_choices(mask, 4) == 'ABAB'
+    assert core.unpack_choices('ABAB') == mask
+    assert core.unpack_choices('') == 0
+
+
+# ******************************************************************************************************************** #
+# *** CONSISTENCY AND SWITCHING ROW
+# ******************************************************************************************************************** #
+
+# choices are consistent if all "A" choices precede all "B" choices; the switching row is the row of the first "B"
+# --------------------------------------------------------------------------------------------------------------------
+def test_switching_row():
+    assert core.is_consistent(0) and core.switching_row(0) == 1
+    assert core.is_consistent(0b0111) and core.switching_row(0b0111) == 4
+    assert core.is_consistent(0b1111111111) and core.switching_row(0b1111111111) == 11
+    assert not core.is_consistent(0b101) and core.switching_row(0b101) is None
+    assert not core.is_consistent(0b0110) and core.switching_row(0b0110) is None
+
+
+# ******************************************************************************************************************** #
+# *** BISECTION
+# ******************************************************************************************************************** #
+
+# answering the choices asked for as implied by a switching row elicits that switching row, and the implied choices
+# are consistent with it
+# --------------------------------------------------------------------------------------------------------------------
+def test_bisection():
+    for row in range(1, 12):
+        mask = core.switching_mask(row)
+        lo, hi = core.bisection_start(10)
+        asked = 0
+        while core.bisection_index(lo, hi) is not None:
+            index = core.bisection_index(lo, hi)
+            lo, hi = core.bisection_step(lo, hi, index, core.option(mask, index))
+            asked += 1
+        assert lo == hi == row and asked <= 4
+        assert core.switching_row(mask) == row
+
+
+# answers to other choices than the one asked for do not change the range of possible switching rows
+# --------------------------------------------------------------------------------------------------------------------
+def test_bisection_step_ignored():
+    assert core.bisection_step(1, 11, 3, 'A') == (1, 11)
+    assert core.bisection_step(1, 11, None, 'A') == (1, 11)
+    assert core.bisection_step(1, 11, 6, '') == (1, 11)
+    assert core.bisection_step(1, 11, 6, 'B') == (1, 6)
+
+
+# ******************************************************************************************************************** #
+# *** SETTLEMENT
+# ******************************************************************************************************************** #
+
+# the "high" outcome of each decision is paid with the probability displayed for the decision (see <probability>), with
+# and without the certain choice; rates are estimated from draws of a fixed seed
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_payments_probability():
+    for certain_choice in [True, False]:
+        indices = core.choice_indices(10, certain_choice)
+        index_to_pay, draws = core.batch_payments(200000, indices, 10, seed=1)
+        high = core.batch_settle(index_to_pay, np.ones(len(draws), dtype=bool), draws, 1, 0, 1, 0)
+        assert set(draws.tolist()) == set(range(1, 11))
+        for k in indices:
+            assert abs(high[index_to_pay == k].mean() - core.probability(k, 10)) < 0.01
+
+
+# ******************************************************************************************************************** #
+# *** CRRA INTERVALS
+# ******************************************************************************************************************** #
+
+# intervals of the original Holt/Laury (2002) parameterization (Table 3), e.g. six "A" choices (switching row 7)
+# imply a coefficient in between 0.41 and 0.68
+# --------------------------------------------------------------------------------------------------------------------
+def test_crra_intervals_holt_laury():
+    intervals = core.crra_intervals(10, True, 2.0, 1.6, 3.85, 0.1)
+    rounded = [tuple(None if r is None else round(r, 2) for r in interval) for interval in intervals]
+    assert rounded[:10] == [
+        (None, -1.71), (-1.71, -0.95), (-0.95, -0.49), (-0.49, -0.14), (-0.14, 0.15),
+        (0.15, 0.41), (0.41, 0.68), (0.68, 0.97), (0.97, 1.37), (1.37, None),
+    ]
+    assert rounded[7 - 1] == (0.41, 0.68)
+
+
+# the limits of the CRRA intervals are the indifference points at the probabilities with which the "high" outcome is
+# paid, i.e. the share of random draws on {1, ..., <num_choices>} paying "high" in the decision
+# --------------------------------------------------------------------------------------------------------------------
+def test_crra_intervals_payout_probability():
+    intervals = core.crra_intervals(10, True, 2.0, 1.6, 3.85, 0.1)
+    for k in core.choice_indices(10, True)[:-1]:
+        paid = sum(core.payoff('A', k, d, 1, 0, 1, 0) for d in range(1, 11)) / 10
+        assert intervals[k][0] == core.crra_indifference(paid, 2.0, 1.6, 3.85, 0.1)
+
+
+# ******************************************************************************************************************** #
+# *** BATCH FUNCTIONS
+# ******************************************************************************************************************** #
+
+# batch functions agree with their scalar counterparts for all bitmasks of four choices (-1 for inconsistent choices)
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_switching_rows():
+    masks = list(range(16))
+    option_a = [[core.option(mask, k) == 'A' for k in [1, 2, 3, 4]] for mask in masks]
+    assert core.batch_masks(option_a).tolist() == masks
+    assert core.batch_inconsistent(masks).tolist() == [0 if core.is_consistent(m) else 1 for m in masks]
+    assert core.batch_switching_rows(masks).tolist() == [
+        core.switching_row(m) if core.is_consistent(m) else -1 for m in masks
+    ]
+    assert core.batch_switching_rows([0b0101, 0b0111]).tolist() == [-1, 4]
+
+
+# payments drawn from the same seed are identical, i.e. the payments of a session can be reproduced from its seed
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_payments_seed():
+    indices = core.choice_indices(10, True)
+    index_to_pay, draws = core.batch_payments(1000, indices, 10, seed=42)
+    index_to_pay_2, draws_2 = core.batch_payments(1000, indices, 10, seed=42)
+    assert (index_to_pay == index_to_pay_2).all() and (draws == draws_2).all()
+    assert set(index_to_pay.tolist()) == set(indices)
+    assert not (draws == core.batch_payments(1000, indices, 10, seed=43)[1]).all()
+
+
+# payoffs of a batch of players agree with <payoff>
+# --------------------------------------------------------------------------------------------------------------------
+def test_batch_settle():
+    index_to_pay, draws = core.batch_payments(1000, core.choice_indices(10, True), 10, seed=1)
+    masks = np.full(1000, 0b0111)
+    option_a = core.batch_chosen_a(masks, index_to_pay)
+    payoffs = core.batch_settle(index_to_pay, option_a, draws, 2.0, 1.6, 3.85, 0.1)
+    assert payoffs.tolist() == [
+        core.payoff(core.option(0b0111, k), k, d, 2.0, 1.6, 3.85, 0.1)
+        for k, d in zip(index_to_pay.tolist(), draws.tolist())
+    ]
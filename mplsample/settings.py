@@ -8,6 +8,16 @@ SESSION_CONFIGS = [
         num_demo_participants=2,
     ),
 
+    # parameters in mpl/config.py can be overridden per session, e.g.
+    # dict(
+    #     name='mpl_percentage',
+    #     display_name="Multiple Price List (Percentages)",
+    #     app_sequence=['mpl'],
+    #     num_demo_participants=2,
+    #     percentage=True,
+    #     small_pies=False,
+    # ),
+
     # dict(
     #     name='eet',
     #     display_name="Certainty Equivalence Tests",
@@ -25,8 +35,21 @@ SESSION_CONFIG_DEFAULTS = dict(
     real_world_currency_per_point=1.00, participation_fee=0.00, doc=""
 )
 
-PARTICIPANT_FIELDS = []
-SESSION_FIELDS = []
+# state of the mpl app kept per participant across rounds and pages
+# (oTree stores these fields in the participant's pickled <vars> column, i.e. declaring them does not add database
+# columns, but gives validated attribute access and export columns; the task state read and updated on (almost)
+# every request, i.e. the decision to pay, the random draw, the choices made, and whether choices have been settled,
+# is stored in typed columns of the player instead, see <Player.get_task_player> in mpl/models.py)
+PARTICIPANT_FIELDS = [
+    'mpl_seed',
+    'mpl_bisection',
+    'mpl_payoff',
+    'mpl_started',
+    'mpl_seconds',
+    'mpl_switching_point',
+]
+# seed of all payment randomness and running aggregates of the admin report of a session
+SESSION_FIELDS = ['mpl_payment_seed', 'mpl_report']
 
 # ISO-639 code
 # for example: de, fr, ja, ko, zh-hans